@@ -10,6 +10,8 @@ from services.card_data_service import CardDataService
 from services.card_recognition_service import CardRecognitionService
 from utils.image_utils import ImageProcessor
 from utils.loaders import load_all_cards, load_template_images
+from utils.screen_classifier import ScreenClassifier
+from utils.templates import TemplateAnchors
 
 
 class PokemonBot:
@@ -23,13 +25,14 @@ class PokemonBot:
             self.log_callback("🔄 Initializing bot components...")
 
             # Load images
-            self.template_images = load_template_images("images")
+            self.template_images = load_template_images("images", TemplateAnchors())
             images_cards_folder = "images/cards"
             if not os.path.exists(images_cards_folder):
                 os.makedirs(images_cards_folder)
                 self.log_callback("📁 Created cards folder")
             self.card_images = load_all_cards(images_cards_folder)
-            self.log_callback(f"📦 Loaded {len(self.card_images)} card images")
+            self.log_callback(f"📦 Found {len(self.card_images)} card images")
+            self.screen_classifier = ScreenClassifier()
 
             # Initialize services
             self.card_data_service = CardDataService()
@@ -63,6 +66,7 @@ class PokemonBot:
                 self.template_images,
                 self.log_callback,
                 self.debug_window,
+                self.screen_classifier,
             )
 
             self.log_callback("✅ Bot initialization complete")
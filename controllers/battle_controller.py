@@ -2,6 +2,7 @@ import time
 
 from utils.adb_utils import long_press_position, take_screenshot
 from utils.constants import NUMBER_OF_CARDS_REGION, ZOOM_CARD_REGION
+from utils.device_profile import device_profile
 
 
 class BattleController:
@@ -127,11 +128,8 @@ class BattleController:
         return False
 
     def get_card(self, x, y, duration=1.0):
-        x_zoom_card_region, y_zoom_card_region, w, h = ZOOM_CARD_REGION
-        return long_press_position(x, y, duration)[
-            y_zoom_card_region : y_zoom_card_region + h,
-            x_zoom_card_region : x_zoom_card_region + w,
-        ]
+        screenshot = long_press_position(x, y, duration)
+        return device_profile.crop(screenshot, ZOOM_CARD_REGION)
 
     def check_number_of_cards(self, card_x, card_y):
         self.log_callback("Checking the number of cards...")
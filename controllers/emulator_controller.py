@@ -4,11 +4,15 @@ import os
 import subprocess
 import time
 
+from utils.adb_client import AdbClient, AdbError
+from utils.adb_utils import detect_resolution
+
 
 class EmulatorController:
-    def __init__(self, app_state, log_callback):
+    def __init__(self, app_state, log_callback, adb_client=None):
         self.app_state = app_state
         self.log_callback = log_callback
+        self.adb_client = adb_client or AdbClient()
         self.max_reconnect_attempts = 3
         self.reconnect_delay = 5  # seconds
 
@@ -17,22 +21,7 @@ class EmulatorController:
         start_time = time.time()
         while time.time() - start_time < timeout:
             try:
-                result = subprocess.run(
-                    ["adb", "wait-for-device"],
-                    timeout=10,
-                    capture_output=True,
-                    text=True,
-                )
-
-                # Check if device is actually responsive
-                result = subprocess.run(
-                    ["adb", "shell", "getprop", "sys.boot_completed"],
-                    timeout=5,
-                    capture_output=True,
-                    text=True,
-                )
-
-                if result.stdout.strip() == "1":
+                if self.is_boot_completed():
                     return True
 
             except subprocess.TimeoutExpired:
@@ -44,23 +33,70 @@ class EmulatorController:
 
         return False
 
-    def get_emulator_name(self):
+    def is_boot_completed(self):
+        """Check if the device is actually responsive"""
         try:
-            result = subprocess.run(
-                ["adb", "devices", "-l"],
-                timeout=10,
-                capture_output=True,
-                text=True,
+            boot_completed = self.adb_client.shell(
+                "getprop sys.boot_completed", timeout=5
             )
+            return boot_completed.strip() == "1"
+        except (AdbError, OSError):
+            # No device on the server yet, or the server isn't running; let
+            # the adb binary wait for it (and start the server if needed)
+            pass
+
+        subprocess.run(
+            ["adb", "wait-for-device"],
+            timeout=10,
+            capture_output=True,
+            text=True,
+        )
+        result = subprocess.run(
+            ["adb", "shell", "getprop", "sys.boot_completed"],
+            timeout=5,
+            capture_output=True,
+            text=True,
+        )
+        return result.stdout.strip() == "1"
+
+    def list_device_lines(self):
+        """Return the `adb devices -l` lines without the header"""
+        try:
+            return self.adb_client.devices()
+        except (AdbError, OSError):
+            pass
+
+        result = subprocess.run(
+            ["adb", "devices", "-l"],
+            timeout=10,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise AdbError(f"ADB command failed: {result.stderr}")
+        return result.stdout.splitlines()[1:]  # Skip header
+
+    def adb_connect(self, address):
+        """Run `adb connect` and return its output"""
+        try:
+            return self.adb_client.connect(address)
+        except (AdbError, OSError):
+            pass
+
+        result = subprocess.run(
+            ["adb", "connect", address],
+            timeout=10,
+            capture_output=True,
+            text=True,
+        )
+        return result.stdout
 
-            if result.returncode != 0:
-                self.log_callback(f"ADB command failed: {result.stderr}")
-                return None
-
-            lines = result.stdout.splitlines()
+    def get_emulator_name(self):
+        try:
+            lines = self.list_device_lines()
             devices = []
 
-            for line in lines[1:]:  # Skip the first line (header)
+            for line in lines:
                 if line.strip():
                     parts = line.split()
                     if len(parts) >= 2:
@@ -115,6 +151,7 @@ class EmulatorController:
                 if device["id"] == device_id and device["state"] == "device":
                     self.log_callback(f"Device {device_id} is already connected")
                     self.app_state.emulator_name = device_id
+                    self.detect_resolution()
                     return True
 
             # If not connected, try to connect
@@ -126,29 +163,30 @@ class EmulatorController:
             else:
                 connect_address = device_id
 
-            result = subprocess.run(
-                ["adb", "connect", connect_address],
-                timeout=10,
-                capture_output=True,
-                text=True,
-            )
+            output = self.adb_connect(connect_address)
 
-            if "connected" in result.stdout.lower():
+            if "connected" in output.lower():
                 if self.wait_for_device():
                     self.log_callback(f"Successfully connected to {device_id}")
                     self.app_state.emulator_name = device_id
+                    self.detect_resolution()
                     return True
                 else:
                     self.log_callback("Device connection timed out")
                     return False
             else:
-                self.log_callback(f"Failed to connect to {device_id}: {result.stdout}")
+                self.log_callback(f"Failed to connect to {device_id}: {output}")
                 return False
 
         except Exception as e:
             self.log_callback(f"Error connecting to device: {e}")
             return False
 
+    def detect_resolution(self):
+        """Scale coordinates and templates to the connected device's screen"""
+        width, height = detect_resolution()
+        self.log_callback(f"Device resolution: {width}x{height}")
+
     def connect_and_run(self):
         """Initial connection attempt when bot starts"""
         attempts = 0
@@ -234,15 +272,8 @@ class EmulatorController:
     def get_all_devices(self):
         """Get list of all connected devices with their states"""
         try:
-            result = subprocess.run(
-                ["adb", "devices", "-l"],
-                timeout=10,
-                capture_output=True,
-                text=True,
-            )
-
             devices = []
-            lines = result.stdout.splitlines()[1:]  # Skip header
+            lines = self.list_device_lines()
 
             for line in lines:
                 if line.strip():
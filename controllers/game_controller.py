@@ -6,6 +6,17 @@ import traceback
 from utils.adb_utils import click_position, drag_position, take_screenshot
 from utils.battle_log import BattleLog
 from utils.constants import bench_positions, card_offset_mapping, default_pokemon_stats
+from utils.frame_grabber import frame_grabber, next_screenshot, poll_screenshots
+
+# Screens that mean the battle is over and the next step can start
+NEXT_STEP_SCREENS = (
+    "NEXT_BUTTON",
+    "THANKS_BUTTON",
+    "BATTLE_BUTTON",
+    "CROSS_BUTTON",
+    "BATTLE_ALREADY_SCREEN",
+    "BATTLE_SCREEN",
+)
 
 card_effects = {
     "professor's research": lambda hand_size: 2,  # Draw 2 (+2)
@@ -25,6 +36,7 @@ class GameController:
         template_images,
         log_callback,
         debug_window=None,
+        screen_classifier=None,
     ):
         self.app_state = app_state
         self.emulator_controller = emulator_controller
@@ -34,6 +46,7 @@ class GameController:
         self.game_state = game_state
         self.template_images = template_images
         self.log_callback = log_callback
+        self.screen_classifier = screen_classifier
         self.running_event = threading.Event()  # Use threading.Event
 
         ## COORDS
@@ -77,6 +90,7 @@ class GameController:
                 return
 
             self.log_callback("✅ Connected successfully")
+            frame_grabber.start()
 
             while self.running_event.is_set():
                 try:
@@ -116,6 +130,8 @@ class GameController:
             error_msg = f"❌ Critical error in bot loop:\n{e!s}\n\nTraceback:\n{''.join(traceback.format_exc())}"
             self.log_callback(error_msg)
             self.running_event.clear()
+        finally:
+            frame_grabber.stop()
 
     def prepare_for_battle(self):
         self.game_state.reset()
@@ -149,7 +165,7 @@ class GameController:
 
     def handle_battle(self):
         while self.running_event.is_set():
-            screenshot = take_screenshot()
+            screenshot = next_screenshot(max_age=0.5)
             if self.is_battle_over(screenshot) or self.next_step_available(screenshot):
                 break
 
@@ -670,17 +686,14 @@ class GameController:
         if not self.running_event.is_set():
             return
         time.sleep(4)
-        screenshot = take_screenshot()
+        screenshot = next_screenshot(max_age=0.5)
         if self.image_processor.check_and_click(
             screenshot, self.template_images["TAP_TO_PROCEED_BUTTON"], "Game ended"
         ):
             time.sleep(2)
 
         max_attempts = 5
-        for _ in range(max_attempts):
-            if not self.running_event.is_set():
-                return
-            screenshot = take_screenshot()
+        for screenshot in poll_screenshots(1, max_attempts, self.running_event):
             if self.image_processor.check_and_click(
                 screenshot,
                 self.template_images["NEXT_BUTTON"],
@@ -688,12 +701,10 @@ class GameController:
             ):
                 time.sleep(2)
                 break
-            time.sleep(1)
+        if not self.running_event.is_set():
+            return
 
-        for _ in range(max_attempts):
-            if not self.running_event.is_set():
-                return
-            screenshot = take_screenshot()
+        for screenshot in poll_screenshots(1, max_attempts, self.running_event):
             if self.image_processor.check_and_click(
                 screenshot,
                 self.template_images["THANKS_BUTTON"],
@@ -701,7 +712,8 @@ class GameController:
             ):
                 time.sleep(3)
                 break
-            time.sleep(1)
+        if not self.running_event.is_set():
+            return
 
         self.image_processor.check_and_click(
             screenshot,
@@ -711,32 +723,29 @@ class GameController:
         time.sleep(3)
 
     def is_battle_over(self, screenshot):
+        if self.classify_screen(screenshot) == "TAP_TO_PROCEED_BUTTON":
+            return True
         return self.image_processor.check(
             screenshot, self.template_images["TAP_TO_PROCEED_BUTTON"], "Game ended"
         )
 
     def next_step_available(self, screenshot):
-        return (
-            self.image_processor.check(
-                screenshot, self.template_images["NEXT_BUTTON"], None
-            )
-            or self.image_processor.check(
-                screenshot, self.template_images["THANKS_BUTTON"], None
-            )
-            or self.image_processor.check(
-                screenshot, self.template_images["BATTLE_BUTTON"], None
-            )
-            or self.image_processor.check(
-                screenshot, self.template_images["CROSS_BUTTON"], None
-            )
-            or self.image_processor.check(
-                screenshot, self.template_images["BATTLE_ALREADY_SCREEN"], None
-            )
-            or self.image_processor.check(
-                screenshot, self.template_images["BATTLE_SCREEN"], None
-            )
+        if self.classify_screen(screenshot) in NEXT_STEP_SCREENS:
+            return True
+        return self.image_processor.check_any(
+            screenshot, [self.template_images[name] for name in NEXT_STEP_SCREENS]
         )
 
+    def classify_screen(self, screenshot):
+        """
+        Screen id from the screen classifier, or None if it is not sure. Only
+        trusted to confirm a screen: its thumbnail cannot see button overlays,
+        so any other answer still falls back to template matching.
+        """
+        if self.screen_classifier is None:
+            return None
+        return self.screen_classifier.identify(screenshot)
+
     def check_number_of_cards(self, cards_delta=0):
         if not self.running_event.is_set():
             return
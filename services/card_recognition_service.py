@@ -2,14 +2,17 @@
 
 import os
 import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import requests
 
-from utils.adb_utils import find_subimage
+from utils.card_index import CardIndex, difference_hash, rank_by_hash
 from utils.constants import card_offset_mapping
 from utils.deck import deck_info, save_deck
+from utils.matching import match_template, prepare_frame
 
 
 class CardRecognitionService:
@@ -28,6 +31,20 @@ class CardRecognitionService:
         self.log_callback = log_callback
         self.deck_info = deck_info
         self.card_images = card_images
+        self.card_index = CardIndex()
+        self.card_index.add_descriptors(card_images.load_descriptors())
+        # Nearest index candidates confirmed by template matching
+        self.card_candidates = 5
+        # API card images resized for comparison, with their hashes
+        self.api_card_images = {}
+        # Hash-ranked API cards scored with SSIM for the options dialog
+        self.ssim_candidates = 3
+        # Identifies scanned hand cards while the next one is long-pressed
+        self.recognition_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="hand-scan"
+        )
+        # Seconds spent per stage by the last check_cards
+        self.last_scan_timings = {}
         self.card_images_api_cache_path = "card_images_api_cache"
 
         # Create folder if it doesn't exist
@@ -37,12 +54,20 @@ class CardRecognitionService:
     def check_cards(
         self, number_of_cards, card_start_x, card_y, hand_state, debug_images=False
     ):
+        """
+        Long-press every hand card in turn, identifying each one on the
+        recognition worker while the next is being pressed. Cards nobody
+        recognises are resolved with the user afterwards, in hand order.
+        """
         self.log_callback("Start checking hand cards...")
         x = card_start_x
-        hand_cards = []
         hand_state.clear()
+        timings = {"capture": 0.0, "recognition": 0.0, "resolve": 0.0}
+        scan_started = time.perf_counter()
 
+        scans = []
         for i in range(number_of_cards):
+            capture_started = time.perf_counter()
             self.image_processor.reset_view()
             # Get debug window from UI instance
             debug_window = self.ui_instance.debug_window if self.ui_instance else None
@@ -53,58 +78,92 @@ class CardRecognitionService:
                 card_y,
                 0.7,
                 debug_window=debug_window,
-                debug_message=f"Getting card {i+1} of {number_of_cards}",
+                debug_message=f"Getting card {i + 1} of {number_of_cards}",
             )
+            timings["capture"] += time.perf_counter() - capture_started
 
             if debug_images:
                 self.save_debug_image(zoomed_card_image)
 
-            card_id = self.identify_card(zoomed_card_image)
-            selected_card = None
+            scans.append(
+                (
+                    zoomed_card_image,
+                    self.recognition_executor.submit(
+                        self._timed_identify_card, zoomed_card_image
+                    ),
+                )
+            )
+            x -= card_offset_mapping.get(number_of_cards, 20)
 
+        learned_card = False
+        for i, (zoomed_card_image, recognition) in enumerate(scans):
+            card_id, recognition_time = recognition.result()
+            timings["recognition"] += recognition_time
+            resolve_started = time.perf_counter()
+            if card_id is None and learned_card:
+                # The card may be a copy of one learnt earlier in this scan
+                card_id = self.identify_card(zoomed_card_image)
             if card_id is None:
                 card_id, selected_card = self.handle_unknown_card(zoomed_card_image)
-                if not card_id or not selected_card:
-                    x -= card_offset_mapping.get(number_of_cards, 20)
-                    continue
+                learned_card = learned_card or bool(card_id and selected_card)
             else:
-                # Attempt to retrieve card info from deck_info or card_data_service
-                selected_card = self.deck_info.get(card_id)
-                if not selected_card:
-                    card_data = self.card_data_service.get_card_by_id(card_id)
-                    if card_data:
-                        selected_card = self.convert_api_card_data(card_data)
-                        # Update deck_info with the new card info
-                        self.deck_info[card_id] = selected_card
-                        save_deck(self.deck_info)
-                    else:
-                        self.log_callback(
-                            f"No card data found for card ID '{card_id}'."
-                        )
-                        x -= card_offset_mapping.get(number_of_cards, 20)
-                        continue
-            cap_name = selected_card["name"].capitalize()
-            hand_cards.append(cap_name)
-            card_info_with_position = {
-                "name": cap_name,
-                "info": selected_card,
-                "position": i,
-            }
-            hand_state.append(card_info_with_position)
-            x -= card_offset_mapping.get(number_of_cards, 20)
+                selected_card = self.get_card_info(card_id)
+            timings["resolve"] += time.perf_counter() - resolve_started
+            if not card_id or not selected_card:
+                continue
+            hand_state.append(
+                {
+                    "name": selected_card["name"].capitalize(),
+                    "info": selected_card,
+                    "position": i,
+                }
+            )
 
-    def identify_card(self, zoomed_card_image):
-        highest_similarity = 0
-        identified_card = None
+        timings["total"] = time.perf_counter() - scan_started
+        self.last_scan_timings = timings
+        self.log_callback(
+            f"Hand scan: {number_of_cards} cards in {timings['total']:.2f}s "
+            f"(capture {timings['capture']:.2f}s, "
+            f"recognition {timings['recognition']:.2f}s overlapped, "
+            f"resolve {timings['resolve']:.2f}s)"
+        )
 
-        for card_file_name, template_image in self.card_images.items():
-            base_card_name_id = os.path.splitext(card_file_name)[0]
-            _, similarity = find_subimage(zoomed_card_image, template_image)
-            if similarity > 0.7 and similarity > highest_similarity:
-                highest_similarity = similarity
-                identified_card = base_card_name_id
+    def _timed_identify_card(self, zoomed_card_image):
+        started = time.perf_counter()
+        card_id = self.identify_card(zoomed_card_image)
+        return card_id, time.perf_counter() - started
 
-        return identified_card
+    def get_card_info(self, card_id):
+        """Card info from deck_info, fetched and saved on first use, or None."""
+        selected_card = self.deck_info.get(card_id)
+        if selected_card:
+            return selected_card
+        card_data = self.card_data_service.get_card_by_id(card_id)
+        if not card_data:
+            self.log_callback(f"No card data found for card ID '{card_id}'.")
+            return None
+        selected_card = self.convert_api_card_data(card_data)
+        # Update deck_info with the new card info
+        self.deck_info[card_id] = selected_card
+        save_deck(self.deck_info)
+        return selected_card
+
+    def identify_card(self, zoomed_card_image):
+        # The zoomed card is cropped back to its reference size, so the index
+        # candidates are confirmed without rescaling, at their coarsest
+        # pyramid level: enough to tell a few cards apart in a millisecond.
+        frame = prepare_frame(zoomed_card_image)
+        best = None
+        for key, _ in self.card_index.nearest(frame, self.card_candidates):
+            template = self.card_images.get(key)
+            if template is None:
+                continue
+            _, similarity = match_template(frame, template, method="coarse")
+            if similarity > 0.7 and (best is None or similarity > best[1]):
+                best = (key, similarity)
+        if best is None:
+            return None
+        return os.path.splitext(best[0])[0]
 
     def handle_unknown_card(self, zoomed_card_image):
         event = threading.Event()
@@ -141,36 +200,69 @@ class CardRecognitionService:
             return self.ui_instance.selected_card
 
     def calculate_similarities(self, cards, zoomed_card_image):
-        similarities = []
+        """
+        (card, similarity) for every candidate, best first. All candidates
+        are ranked by dHash; only the best `ssim_candidates` get an SSIM
+        similarity, the rest follow in hash order with a similarity of None.
+        """
+        standard_size = (200, 300)
+        resized_full_card_image = cv2.resize(zoomed_card_image, standard_size)
+        candidates = []
         for card in cards:
-            card_id = card["id"]
-            image_path = os.path.join(self.card_images_api_cache_path, f"{card_id}.png")
-            if not os.path.exists(image_path):
-                # Download and save the image
-                image_url = self.card_data_service.get_card_image_url(card_id)
-                response = requests.get(image_url)
-                with open(image_path, "wb") as f:
-                    f.write(response.content)
-            # Load the image from cache
-            api_card_image = cv2.imread(image_path)
-            card["image"] = api_card_image
-            # Proceed with similarity calculation
-            standard_size = (200, 300)
-            resized_api_card_image = cv2.resize(api_card_image, standard_size)
-            resized_full_card_image = cv2.resize(zoomed_card_image, standard_size)
-            similarity = self.image_processor.calculate_similarity(
-                resized_api_card_image, resized_full_card_image
-            )
+            api_card = self.load_api_card_image(card["id"], standard_size)
+            if api_card is None:
+                continue
+            card["image"] = api_card[0]
+            candidates.append((card, *api_card[1:]))
+
+        order, _ = rank_by_hash(
+            [card_hash for _, _, card_hash in candidates],
+            difference_hash(resized_full_card_image),
+        )
+        similarities = []
+        for rank, index in enumerate(order):
+            card, resized_api_card_image, _ = candidates[index]
+            similarity = None
+            if rank < self.ssim_candidates:
+                similarity = self.image_processor.calculate_similarity(
+                    resized_api_card_image, resized_full_card_image
+                )
             similarities.append((card, similarity))
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        similarities[: self.ssim_candidates] = sorted(
+            similarities[: self.ssim_candidates], key=lambda x: x[1], reverse=True
+        )
         return similarities
 
+    def load_api_card_image(self, card_id, size):
+        """
+        (image, image resized to `size`, its dHash) of an API card image,
+        downloaded on first use and kept in memory afterwards.
+        """
+        cached = self.api_card_images.get(card_id)
+        if cached is not None and cached[1].shape[1::-1] == size:
+            return cached
+        image_path = os.path.join(self.card_images_api_cache_path, f"{card_id}.png")
+        if not os.path.exists(image_path):
+            # Download and save the image
+            image_url = self.card_data_service.get_card_image_url(card_id)
+            response = requests.get(image_url)
+            with open(image_path, "wb") as f:
+                f.write(response.content)
+        api_card_image = cv2.imread(image_path)
+        if api_card_image is None:
+            self.log_callback(f"Failed to load API image for card '{card_id}'.")
+            return None
+        resized = cv2.resize(api_card_image, size)
+        cached = (api_card_image, resized, difference_hash(resized))
+        self.api_card_images[card_id] = cached
+        return cached
+
     def update_deck_and_images(self, selected_card, zoomed_card_image):
         card_info = self.convert_api_card_data(selected_card)
         card_id = selected_card["id"]
         self.deck_info[card_id] = card_info
-        self.card_images[card_id] = zoomed_card_image
-        cv2.imwrite(f"images/cards/{card_id}.png", zoomed_card_image)
+        key, template = self.card_images.add(card_id, zoomed_card_image)
+        self.card_index.add(key, template)
         save_deck(self.deck_info)
 
     def convert_api_card_data(self, card_data):
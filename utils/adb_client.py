@@ -0,0 +1,114 @@
+# utils/adb_client.py
+
+import socket
+
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = 5037
+
+
+class AdbError(Exception):
+    pass
+
+
+class AdbClient:
+    """
+    Minimal client for the adb server's smart-socket protocol.
+
+    Requests are sent as a 4 digit hex length followed by the payload, and
+    the server answers OKAY or FAIL plus a length-prefixed message. Talking
+    to the server directly avoids spawning the adb binary for every call.
+    """
+
+    def __init__(self, host=ADB_SERVER_HOST, port=ADB_SERVER_PORT, timeout=10):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def is_available(self):
+        try:
+            self.version()
+            return True
+        except (AdbError, OSError):
+            return False
+
+    def version(self):
+        return int(self.host_command("host:version"), 16)
+
+    def devices(self):
+        """Return the `adb devices -l` lines reported by the server."""
+        return [
+            line for line in self.host_command("host:devices-l").splitlines() if line
+        ]
+
+    def connect(self, address):
+        return self.host_command(f"host:connect:{address}")
+
+    def host_command(self, request):
+        with self._open_connection() as sock:
+            self._send_request(sock, request)
+            return self._read_block(sock).decode(errors="ignore")
+
+    def open_stream(self, service, serial=None, timeout=None):
+        """
+        Open a device service (e.g. "shell:ls" or "exec:screencap").
+
+        Returns the socket positioned at the start of the service's output;
+        the caller owns it and must close it.
+        """
+        sock = self._open_connection(timeout)
+        try:
+            transport = f"host:transport:{serial}" if serial else "host:transport-any"
+            self._send_request(sock, transport)
+            self._send_request(sock, service)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+    def shell(self, command, serial=None, timeout=None):
+        return self.exec_out(command, serial, timeout, service="shell").decode(
+            errors="ignore"
+        )
+
+    def exec_out(self, command, serial=None, timeout=None, service="exec"):
+        with self.open_stream(f"{service}:{command}", serial, timeout) as sock:
+            return self._read_until_close(sock)
+
+    def _open_connection(self, timeout=None):
+        return socket.create_connection(
+            (self.host, self.port), timeout=timeout or self.timeout
+        )
+
+    def _send_request(self, sock, request):
+        payload = request.encode()
+        sock.sendall(f"{len(payload):04x}".encode() + payload)
+        status = self._read_exact(sock, 4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            message = self._read_block(sock).decode(errors="ignore")
+            raise AdbError(f"{request} failed: {message}")
+        raise AdbError(f"Unexpected adb server response {status!r} to {request}")
+
+    def _read_block(self, sock):
+        length = int(self._read_exact(sock, 4), 16)
+        return self._read_exact(sock, length)
+
+    def _read_exact(self, sock, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            count = sock.recv_into(view[received:])
+            if count == 0:
+                raise AdbError("adb server closed the connection")
+            received += count
+        return bytes(buffer)
+
+    def _read_until_close(self, sock):
+        chunks = []
+        while True:
+            chunk = sock.recv(1 << 20)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
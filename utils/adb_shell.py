@@ -0,0 +1,201 @@
+# utils/adb_shell.py
+
+import itertools
+import queue
+import re
+import socket
+import subprocess
+import threading
+
+
+class AdbShellError(Exception):
+    pass
+
+
+class _ShellCommand:
+    def __init__(self, command):
+        self.command = command
+        self.done = threading.Event()
+        self.output = None
+        self.status = None
+        self.error = None
+        # Set when the caller gave up waiting; the worker then skips it
+        self.cancelled = False
+
+
+class AdbShell:
+    """
+    Long-lived `adb shell` session.
+
+    Commands are queued and written one after another into the same shell
+    by a worker thread, so callers no longer pay for spawning an adb host
+    process and the device handshake on every input. Each command is
+    followed by an `echo` of a unique marker carrying its exit status, which
+    tells the worker where that command's output ends.
+
+    With an `adb_client` the session is a "shell:" stream opened straight on
+    the adb server socket; otherwise it is an `adb shell` child process.
+    """
+
+    def __init__(self, adb_path="adb", adb_client=None):
+        self.adb_path = adb_path
+        self.adb_client = adb_client
+        self.session = None
+        self.commands = queue.Queue()
+        self.worker = None
+        self.current = None
+        self.lock = threading.Lock()
+        self.sequence = itertools.count()
+
+    def run(self, command, timeout=None):
+        """
+        Queue a shell command and wait for its output. A command that fails
+        because the session broke, e.g. after the adb server dropped it, is
+        retried once on a fresh session.
+        """
+        try:
+            return self._run_once(command, timeout)
+        except AdbShellError:
+            return self._run_once(command, timeout)
+
+    def _run_once(self, command, timeout):
+        self._ensure_worker()
+        item = _ShellCommand(command)
+        self.commands.put(item)
+        if not item.done.wait(timeout):
+            with self.lock:
+                item.cancelled = True
+                running = self.current is item
+            if running:
+                # The shell is stuck on this command; drop the session so the
+                # next command starts from a clean one.
+                self._close_session()
+            raise subprocess.TimeoutExpired(command, timeout)
+        if item.error:
+            raise item.error
+        return item.output
+
+    def close(self):
+        self._close_session()
+
+    def _ensure_worker(self):
+        with self.lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._process_commands)
+                self.worker.daemon = True
+                self.worker.start()
+
+    def _ensure_session(self):
+        with self.lock:
+            session = self.session
+            created = session is None or not session.is_alive()
+            if created:
+                session = self.session = self._open_session()
+        if created:
+            # Silence the prompt and tty echo so they don't end up in output
+            self._execute_on(session, "stty -echo 2>/dev/null; PS1=''")
+        return session
+
+    def _open_session(self):
+        if self.adb_client is not None and self.adb_client.is_available():
+            return _SocketSession(self.adb_client.open_stream("shell:"))
+        return _ProcessSession(
+            subprocess.Popen(
+                [self.adb_path, "shell"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+        )
+
+    def _close_session(self):
+        with self.lock:
+            session, self.session = self.session, None
+        if session is not None:
+            session.close()
+
+    def _process_commands(self):
+        while True:
+            item = self.commands.get()
+            with self.lock:
+                if item.cancelled:
+                    continue
+                self.current = item
+            try:
+                item.status, item.output = self._execute_on(
+                    self._ensure_session(), item.command
+                )
+            except Exception as e:
+                self._close_session()
+                item.error = AdbShellError(f"adb shell command failed: {e}")
+            finally:
+                with self.lock:
+                    self.current = None
+                item.done.set()
+
+    def _execute_on(self, session, command):
+        seq = next(self.sequence)
+        # The quotes keep the echoed command line (when the shell has a tty)
+        # from matching the marker pattern.
+        marker = re.compile(rf"__ADB_DONE_(-?\d+)_{seq}__")
+        session.write(f'{command}; echo __ADB_DONE_"$?"_{seq}__\n'.encode())
+
+        lines = []
+        while True:
+            line = session.readline()
+            if not line:
+                raise AdbShellError("adb shell session closed")
+            text = line.decode(errors="ignore").rstrip("\r\n")
+            match = marker.search(text)
+            if match:
+                return int(match.group(1)), "\n".join(lines)
+            lines.append(text)
+
+
+class _ProcessSession:
+    def __init__(self, process):
+        self.process = process
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def write(self, data):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def readline(self):
+        return self.process.stdout.readline()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+
+
+class _SocketSession:
+    def __init__(self, sock):
+        # Reads block until the device answers; timeouts are enforced by the
+        # caller waiting on the command instead.
+        sock.settimeout(None)
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+        self.closed = False
+
+    def is_alive(self):
+        return not self.closed
+
+    def write(self, data):
+        self.sock.sendall(data)
+
+    def readline(self):
+        line = self.reader.readline()
+        if not line:
+            self.closed = True
+        return line
+
+    def close(self):
+        self.closed = True
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
@@ -1,35 +1,57 @@
 # utils/adb_utils.py
 
-import os
+import socket
+import struct
 import subprocess
 import time
 from threading import Thread
 
 import cv2
+import numpy as np
 
+from utils.adb_client import AdbClient, AdbError
+from utils.adb_shell import AdbShell
+from utils.device_profile import device_profile, parse_resolution, reference_profile
+from utils.matching import match_template
+from utils.metrics import adb_metrics
+from utils.screen_stream import ScreenRecordStream
+from utils.templates import Template
 
+# Shared adb server client and shell session used by every device-side
+# command in this module
+adb_client = AdbClient()
+adb_shell = AdbShell(adb_client=adb_client)
+
+
+def shell(*args, timeout=None):
+    """Run a command in the persistent adb shell and return its output."""
+    command = " ".join(str(arg) for arg in args)
+    try:
+        output = adb_shell.run(command, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        adb_metrics.count_timeout()
+        raise
+    adb_metrics.add_bytes(len(command) + len(output))
+    return output
+
+
+@adb_metrics.timed("get_input_device")
 def get_input_device():
     try:
         # First check if we can access the devices list
-        result = subprocess.run(
-            ["adb", "shell", "cat", "/proc/bus/input/devices"],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
+        output = shell("cat", "/proc/bus/input/devices", timeout=10)
 
-        if result.returncode == 0:
-            # Look for the virtual input device that handles both kbd and mouse
-            lines = result.stdout.splitlines()
-            current_device = None
-            for line in lines:
-                if line.startswith("N: Name="):
-                    if "input" in line.lower():
-                        current_device = "/dev/input/event2"
-                        break
+        # Look for the virtual input device that handles both kbd and mouse
+        lines = output.splitlines()
+        current_device = None
+        for line in lines:
+            if line.startswith("N: Name="):
+                if "input" in line.lower():
+                    current_device = "/dev/input/event2"
+                    break
 
-            if current_device:
-                return current_device
+        if current_device:
+            return current_device
 
         # Fallback to event2 as it's the known working device from the device list
         return "/dev/input/event2"
@@ -39,20 +61,208 @@ def get_input_device():
         return "/dev/input/event2"  # Default to event2 based on your device list
 
 
+# (width, height) forced by the config; None asks the device with `wm size`
+resolution_override = None
+
+
+def set_resolution(resolution):
+    """
+    Force the device resolution ("450x800"), or pass None or "auto" to
+    detect it from the device on the next detect_resolution call.
+    """
+    global resolution_override
+    if resolution is None or str(resolution).lower() == "auto":
+        resolution_override = None
+        return
+    resolution_override = parse_resolution(resolution)
+    _apply_resolution(*resolution_override)
+
+
+def _apply_resolution(width, height):
+    if (width, height) == (device_profile.width, device_profile.height):
+        return
+    device_profile.set_resolution(width, height)
+    # screenrecord was started with the old --size
+    screen_stream.stop()
+    screen_stream.width, screen_stream.height = width, height
+
+
+@adb_metrics.timed("detect_resolution")
+def detect_resolution():
+    """
+    Point device_profile at the connected device's resolution and return it
+    as (width, height). An override size set with `wm size` wins over the
+    physical one; the configured resolution wins over both.
+    """
+    if resolution_override is not None:
+        return resolution_override
+    try:
+        output = shell("wm", "size", timeout=10)
+    except Exception as e:
+        print(f"Error reading device resolution: {e}")
+        return device_profile.width, device_profile.height
+    sizes = {}
+    for line in output.splitlines():
+        if ":" in line:
+            label, value = line.split(":", 1)
+            try:
+                sizes[label.strip().lower()] = parse_resolution(value.strip())
+            except ValueError:
+                continue
+    size = sizes.get("override size") or sizes.get("physical size")
+    if size is None:
+        print(f"Unexpected `wm size` output: {output.strip()}")
+        return device_profile.width, device_profile.height
+    _apply_resolution(*size)
+    return size
+
+
+@adb_metrics.timed("connect_to_emulator")
 def connect_to_emulator(emulator_name):
-    subprocess.run(["adb", "connect", emulator_name])
+    try:
+        adb_client.connect(emulator_name)
+    except (AdbError, OSError):
+        subprocess.run(["adb", "connect", emulator_name])
+
+
+# "png" streams `screencap -p`, "raw" streams the uncompressed framebuffer and
+# "stream" reads the newest frame of a continuous screenrecord H.264 stream
+CAPTURE_MODES = ("png", "raw", "stream")
+capture_mode = "raw"
+
+# Started on first use in "stream" mode
+screen_stream = ScreenRecordStream(device_profile.width, device_profile.height)
+
+# (capture start time, frame) of the most recent successful take_screenshot,
+# reused by the debug logging of input actions
+latest_frame = (0.0, None)
+# How old (in seconds) a cached frame may be for debug logging
+debug_frame_max_age = 1.0
+
+# Android pixel formats reported in the raw screencap header
+PIXEL_FORMAT_RGBA_8888 = 1
+PIXEL_FORMAT_RGBX_8888 = 2
+PIXEL_FORMAT_BGRA_8888 = 5
+
+
+def set_capture_mode(mode):
+    global capture_mode
+    if mode not in CAPTURE_MODES:
+        raise ValueError(
+            f"Unknown capture mode '{mode}', expected one of {CAPTURE_MODES}"
+        )
+    capture_mode = mode
+    if mode != "stream":
+        screen_stream.stop()
+
+
+def set_debug_frame_max_age(seconds):
+    global debug_frame_max_age
+    debug_frame_max_age = float(seconds)
+
+
+def recent_screenshot(max_age=None):
+    """
+    Most recent captured frame if it is at most `max_age` seconds old
+    (default `debug_frame_max_age`), otherwise a fresh capture.
+    """
+    if max_age is None:
+        max_age = debug_frame_max_age
+    captured_at, frame = latest_frame
+    if frame is not None and time.time() - captured_at <= max_age:
+        return frame
+    return take_screenshot()
+
+
+def raw_screencap_view(data):
+    """
+    Parse a raw `screencap` payload without copying it.
+
+    Returns (rgba, pixel_format) where rgba is a (height, width, 4) view over
+    `data`. Android 9+ adds a colour space word to the 12 byte header, so the
+    header size is inferred from the payload length.
+    """
+    if len(data) < 12:
+        raise ValueError(f"Raw screencap too short ({len(data)} bytes)")
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    payload_size = width * height * 4
+    header_size = len(data) - payload_size
+    if header_size not in (12, 16):
+        raise ValueError(
+            f"Unexpected raw screencap size {len(data)} for {width}x{height}"
+        )
+    rgba = np.frombuffer(
+        data, dtype=np.uint8, count=payload_size, offset=header_size
+    ).reshape(height, width, 4)
+    return rgba, pixel_format
+
+
+def _rgba_to_bgr(rgba, pixel_format):
+    if pixel_format == PIXEL_FORMAT_BGRA_8888:
+        return cv2.cvtColor(rgba, cv2.COLOR_BGRA2BGR)
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
 
 
-def take_screenshot(screenshot_object_receiver=None):
-    screenshot_path = os.path.join("images", "screenshot.png")
+def decode_raw_screencap(data):
+    """Convert a raw `screencap` payload into a BGR image."""
+    return _rgba_to_bgr(*raw_screencap_view(data))
+
+
+def _exec_out(args, timeout=5):
+    try:
+        data = adb_client.exec_out(" ".join(args), timeout=timeout)
+        adb_metrics.add_bytes(len(data))
+        return data or None
+    except socket.timeout as e:
+        adb_metrics.count_timeout()
+        raise subprocess.TimeoutExpired(["exec-out", *args], timeout) from e
+    except (AdbError, OSError):
+        # adb server not reachable directly; the adb binary will start it
+        pass
     try:
-        subprocess.run(
-            ["adb", "shell", "screencap", "/sdcard/screenshot.png"], timeout=5
+        result = subprocess.run(
+            ["adb", "exec-out", *args], capture_output=True, timeout=timeout
         )
-        subprocess.run(
-            ["adb", "pull", "/sdcard/screenshot.png", screenshot_path], timeout=5
+    except subprocess.TimeoutExpired:
+        adb_metrics.count_timeout()
+        raise
+    adb_metrics.add_bytes(len(result.stdout))
+    if result.returncode != 0 or not result.stdout:
+        print(
+            f"adb exec-out {' '.join(args)} failed: {result.stderr.decode(errors='ignore')}"
         )
-        screenshot = cv2.imread(screenshot_path)
+        return None
+    return result.stdout
+
+
+@adb_metrics.timed("take_screenshot", none_is_error=True)
+def take_screenshot(screenshot_object_receiver=None, mode=None):
+    """
+    Capture the device screen straight into memory.
+
+    The frame is streamed over `adb exec-out`, so no file is written on the
+    device or on the host. `mode` overrides the module wide `capture_mode`.
+    """
+    global latest_frame
+    mode = mode or capture_mode
+    started = time.time()
+    try:
+        if mode == "stream":
+            screenshot = screen_stream.latest_frame()
+        elif mode == "raw":
+            data = _exec_out(["screencap"])
+            screenshot = decode_raw_screencap(data) if data else None
+        else:
+            data = _exec_out(["screencap", "-p"])
+            screenshot = (
+                cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if data
+                else None
+            )
+        if screenshot is None:
+            print(f"Failed to capture screenshot ({mode})")
+            return None
+        latest_frame = (started, screenshot)
         if screenshot_object_receiver:
             screenshot_object_receiver.last_screenshot = screenshot
         return screenshot
@@ -64,21 +274,101 @@ def take_screenshot(screenshot_object_receiver=None):
         return None
 
 
+@adb_metrics.timed("capture_regions", none_is_error=True)
+def capture_regions(regions, mode=None):
+    """
+    Capture the screen once and return one BGR crop per (x, y, w, h) region.
+    Regions are in reference coordinates and crops come back at their
+    reference size whatever the device resolution.
+
+    In raw mode each crop is sliced straight out of the framebuffer bytes and
+    only those pixels are colour converted, so the full frame is never
+    decoded. PNG frames have to be decoded whole before cropping.
+    """
+    mode = mode or capture_mode
+    try:
+        if mode == "raw":
+            data = _exec_out(["screencap"])
+            if not data:
+                return None
+            rgba, pixel_format = raw_screencap_view(data)
+            crops = []
+            for region in regions:
+                x, y, w, h = device_profile.region(region)
+                crop = _rgba_to_bgr(rgba[y : y + h, x : x + w], pixel_format)
+                crops.append(device_profile.to_reference_image(crop, region[2:]))
+            return crops
+
+        screenshot = take_screenshot(mode=mode)
+        if screenshot is None:
+            return None
+        return [device_profile.crop(screenshot, region) for region in regions]
+    except subprocess.TimeoutExpired:
+        print("ADB command timed out. Emulator may be unresponsive.")
+        return None
+    except Exception as e:
+        print(f"Error capturing regions: {e}")
+        return None
+
+
+def benchmark_capture(frames=10, modes=CAPTURE_MODES):
+    """
+    Measure per-frame capture latency for each capture mode.
+
+    Returns {mode: {"frames", "failed", "mean_ms", "min_ms", "max_ms"}}.
+    """
+    results = {}
+    for mode in modes:
+        timings = []
+        failed = 0
+        for _ in range(frames):
+            start = time.perf_counter()
+            screenshot = take_screenshot(mode=mode)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if screenshot is None:
+                failed += 1
+            else:
+                timings.append(elapsed_ms)
+        results[mode] = {
+            "frames": len(timings),
+            "failed": failed,
+            "mean_ms": sum(timings) / len(timings) if timings else None,
+            "min_ms": min(timings) if timings else None,
+            "max_ms": max(timings) if timings else None,
+        }
+    if capture_mode != "stream":
+        screen_stream.stop()
+    return results
+
+
+@adb_metrics.timed("click_position")
 def click_position(x, y, debug_window=None, screenshot=None):
+    device_x, device_y = device_profile.point(x, y)
     if debug_window and debug_window.window is not None and debug_window.is_open:
         if screenshot is None:
-            screenshot = take_screenshot()
-        action_coords = {"type": "click", "coords": (x, y)}
+            screenshot = recent_screenshot()
+        action_coords = {"type": "click", "coords": (device_x, device_y)}
         debug_window.log_action(f"Click at ({x}, {y})", screenshot, action_coords)
-    subprocess.run(["adb", "shell", "input", "tap", str(x), str(y)])
+    shell("input", "tap", device_x, device_y)
 
 
-def find_subimage(screenshot, subimage):
-    result = cv2.matchTemplate(screenshot, subimage, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(result)
-    return max_loc, max_val
+def find_subimage(screenshot, subimage, threshold=None, reference=False):
+    """
+    Best match of a reference-resolution template in a device frame, or with
+    `reference` in an image already at reference size, as (position in
+    reference coordinates, similarity). With the early-exit matcher,
+    `threshold` ends the search at the first match above it.
+    """
+    if isinstance(subimage, Template):
+        return subimage.find(screenshot, threshold, reference)
+    profile = reference_profile if reference else device_profile
+    position, similarity = match_template(
+        screenshot, profile.image(subimage), threshold=threshold
+    )
+    return profile.to_reference(*position), similarity
 
 
+@adb_metrics.timed("long_press_position")
 def long_press_position(x, y, duration=1.0, debug_window=None, debug_message=None):
     screenshot = None
 
@@ -91,25 +381,16 @@ def long_press_position(x, y, duration=1.0, debug_window=None, debug_message=Non
     screenshot_thread.start()
 
     # Execute the long press
-    subprocess.run(
-        [
-            "adb",
-            "shell",
-            "input",
-            "swipe",
-            str(x),
-            str(y),
-            str(x),
-            str(y),
-            str(int(duration * 1000)),
-        ]
+    device_x, device_y = device_profile.point(x, y)
+    shell(
+        "input", "swipe", device_x, device_y, device_x, device_y, int(duration * 1000)
     )
 
     screenshot_thread.join()
 
     # Log to debug window if available
     if debug_window and debug_window.window is not None and debug_window.is_open:
-        action_coords = {"type": "long_press", "coords": (x, y)}
+        action_coords = {"type": "long_press", "coords": (device_x, device_y)}
         debug_window.log_action(
             f"{debug_message or 'Long press'} at ({x}, {y})", screenshot, action_coords
         )
@@ -117,13 +398,16 @@ def long_press_position(x, y, duration=1.0, debug_window=None, debug_message=Non
     return screenshot
 
 
+@adb_metrics.timed("drag_position")
 def drag_position(start_pos, end_pos, duration=0.5, debug_window=None, screenshot=None):
     start_x, start_y = start_pos
     end_x, end_y = end_pos
+    device_start = device_profile.point(start_x, start_y)
+    device_end = device_profile.point(end_x, end_y)
     if debug_window and debug_window.window is not None and debug_window.is_open:
         if screenshot is None:
-            screenshot = take_screenshot()
-        action_coords = {"type": "drag", "coords": (start_x, start_y, end_x, end_y)}
+            screenshot = recent_screenshot()
+        action_coords = {"type": "drag", "coords": (*device_start, *device_end)}
         debug_window.log_action(
             f"Drag from ({start_x}, {start_y}) to ({end_x}, {end_y})",
             screenshot,
@@ -132,33 +416,31 @@ def drag_position(start_pos, end_pos, duration=0.5, debug_window=None, screensho
 
     duration_ms = int(duration * 1000)
 
-    subprocess.run(
-        [
-            "adb",
-            "shell",
-            "input",
-            "swipe",
-            str(start_x),
-            str(start_y),
-            str(end_x),
-            str(end_y),
-            str(duration_ms),
-        ]
-    )
+    shell("input", "swipe", *device_start, *device_end, duration_ms)
 
 
+@adb_metrics.timed("send_event")
 def send_event(device, type, code, value):
-    subprocess.run(
-        ["adb", "shell", "sendevent", device, str(type), str(code), str(value)]
+    shell("sendevent", device, type, code, value)
+
+
+@adb_metrics.timed("send_events")
+def send_events(device, events):
+    """Send several (type, code, value) events in a single shell round-trip."""
+    shell(
+        "; ".join(
+            f"sendevent {device} {type} {code} {value}" for type, code, value in events
+        )
     )
 
 
+@adb_metrics.timed("drag_points")
 def drag_points(points, duration=1.0, device=None):
     """
     Perform a drag operation through multiple points.
 
     Args:
-        points: List of (x, y) tuples representing the points to drag through
+        points: List of reference (x, y) tuples representing the points to drag through
         duration: Total duration of the entire drag operation in seconds
         device: The input device path (will be auto-detected if None)
     """
@@ -170,31 +452,48 @@ def drag_points(points, duration=1.0, device=None):
 
     # Delay between points
     delay = duration / (len(points) - 1)
+    points = [device_profile.point(x, y) for x, y in points]
 
     # Start the touch
-    send_event(device, 3, 57, 0)  # EV_ABS, ABS_MT_TRACKING_ID, 0
     x, y = points[0]
-    send_event(device, 3, 53, x)  # EV_ABS, ABS_MT_POSITION_X, x
-    send_event(device, 3, 54, y)  # EV_ABS, ABS_MT_POSITION_Y, y
-    send_event(device, 0, 0, 0)  # EV_SYN, SYN_REPORT, 0
+    send_events(
+        device,
+        [
+            (3, 57, 0),  # EV_ABS, ABS_MT_TRACKING_ID, 0
+            (3, 53, x),  # EV_ABS, ABS_MT_POSITION_X, x
+            (3, 54, y),  # EV_ABS, ABS_MT_POSITION_Y, y
+            (0, 0, 0),  # EV_SYN, SYN_REPORT, 0
+        ],
+    )
     print(f"Start at ({x}, {y})")  # Debug log
 
     time.sleep(delay)
 
     # Move through intermediate points
     for i, (x, y) in enumerate(points[1:], start=1):
-        send_event(device, 3, 53, x)  # EV_ABS, ABS_MT_POSITION_X, x
-        send_event(device, 3, 54, y)  # EV_ABS, ABS_MT_POSITION_Y, y
-        send_event(device, 0, 0, 0)  # EV_SYN, SYN_REPORT, 0
+        send_events(
+            device,
+            [
+                (3, 53, x),  # EV_ABS, ABS_MT_POSITION_X, x
+                (3, 54, y),  # EV_ABS, ABS_MT_POSITION_Y, y
+                (0, 0, 0),  # EV_SYN, SYN_REPORT, 0
+            ],
+        )
         print(f"Move to ({x}, {y}), point {i}")  # Debug log
         time.sleep(delay)
 
     # End the touch
-    send_event(device, 3, 57, -1)  # EV_ABS, ABS_MT_TRACKING_ID, -1
-    send_event(device, 0, 0, 0)  # EV_SYN, SYN_REPORT, 0
+    send_events(
+        device,
+        [
+            (3, 57, -1),  # EV_ABS, ABS_MT_TRACKING_ID, -1
+            (0, 0, 0),  # EV_SYN, SYN_REPORT, 0
+        ],
+    )
     print("End touch")  # Debug log
 
 
+@adb_metrics.timed("drag_first_y")
 def drag_first_y(start_pos, end_pos, duration=0.5, debug_window=None, screenshot=None):
     """
     Performs a drag operation through three sequential touch points.
@@ -208,8 +507,11 @@ def drag_first_y(start_pos, end_pos, duration=0.5, debug_window=None, screenshot
     # Log the action if debug window is available
     if debug_window and debug_window.window is not None and debug_window.is_open:
         if screenshot is None:
-            screenshot = take_screenshot()
-        action_coords = {"type": "drag_first_y", "coords": points}
+            screenshot = recent_screenshot()
+        action_coords = {
+            "type": "drag_first_y",
+            "coords": [device_profile.point(x, y) for x, y in points],
+        }
         points_str = " -> ".join([f"({x}, {y})" for x, y in points])
         debug_window.log_action(
             f"Drag through points: {points_str}", screenshot, action_coords
@@ -1,9 +1,9 @@
 import time
 
-import cv2
-
 from utils.adb_utils import click_position, take_screenshot
+from utils.device_profile import device_profile
 from utils.image_utils import ImageProcessor
+from utils.loaders import load_template
 
 BATTLE_LOG_TEXT_REGION = (225, 1153, 441, 58)
 BATTLE_LOG_CARD_POSITION = (133, 1181)
@@ -21,9 +21,9 @@ class BattleLog:
         self.last_screenshot = None
 
         # Load template images
-        self.bl_discarded = cv2.imread("images/bl_discarded.PNG")
-        self.bl_put_on_bench = cv2.imread("images/bl_put_on_bench.PNG")
-        self.bl_put_on_active = cv2.imread("images/bl_put_on_active.PNG")
+        self.bl_discarded = load_template("images/bl_discarded.PNG")
+        self.bl_put_on_bench = load_template("images/bl_put_on_bench.PNG")
+        self.bl_put_on_active = load_template("images/bl_put_on_active.PNG")
 
     def identify_battle_log_card(self):
         """
@@ -40,10 +40,7 @@ class BattleLog:
             self.log_callback("Failed to take screenshot in identify_battle_log_card")
             return None, None
 
-        zoomed_card = screenshot[
-            ZOOM_CARD_REGION[1] : ZOOM_CARD_REGION[1] + ZOOM_CARD_REGION[3],
-            ZOOM_CARD_REGION[0] : ZOOM_CARD_REGION[0] + ZOOM_CARD_REGION[2],
-        ]
+        zoomed_card = device_profile.crop(screenshot, ZOOM_CARD_REGION)
 
         # Reset view to close zoom
         self.image_processor.reset_view()
@@ -80,18 +77,11 @@ class BattleLog:
         Returns: str - 'discarded', 'bench', or None if no match found
         """
         # Original action detection code moved here
-        screenshot = take_screenshot()
-        if screenshot is None:
+        battle_log_region = self.image_processor.capture_region(BATTLE_LOG_TEXT_REGION)
+        if battle_log_region is None:
             self.log_callback("Failed to take screenshot in check_battle_log_action")
             return None
 
-        battle_log_region = screenshot[
-            BATTLE_LOG_TEXT_REGION[1] : BATTLE_LOG_TEXT_REGION[1]
-            + BATTLE_LOG_TEXT_REGION[3],
-            BATTLE_LOG_TEXT_REGION[0] : BATTLE_LOG_TEXT_REGION[0]
-            + BATTLE_LOG_TEXT_REGION[2],
-        ]
-
         bench_similarity = self.image_processor.calculate_similarity(
             battle_log_region, self.bl_put_on_bench
         )
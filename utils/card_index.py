@@ -0,0 +1,107 @@
+# utils/card_index.py
+
+import threading
+
+import cv2
+import numpy as np
+
+from utils.matching import prepare_frame
+
+# Width and height cards are shrunk to before comparing (about the zoomed
+# card's 740x1020 aspect ratio)
+DESCRIPTOR_SIZE = (16, 22)
+DESCRIPTOR_LENGTH = DESCRIPTOR_SIZE[0] * DESCRIPTOR_SIZE[1] * 3
+
+
+def card_descriptor(image):
+    """
+    Colour thumbnail of a card image as a zero-mean, unit-length vector, so
+    the dot product of two descriptors is their correlation.
+    """
+    image = prepare_frame(image).image
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    small = cv2.resize(image, DESCRIPTOR_SIZE, interpolation=cv2.INTER_AREA)
+    vector = small.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def difference_hash(image, hash_size=8):
+    """
+    dHash of an image: `hash_size` x `hash_size` bits, one per pair of
+    horizontally adjacent pixels of a grayscale thumbnail, set where the
+    brightness increases. Similar images differ in few bits.
+    """
+    image = prepare_frame(image).gray
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (small[:, 1:] > small[:, :-1]).ravel()
+
+
+def rank_by_hash(hashes, target):
+    """
+    Indices of `hashes` (a sequence of difference_hash results) ordered by
+    Hamming distance to `target`, closest first, and each one's share of
+    matching bits.
+    """
+    if not len(hashes):
+        return np.empty(0, dtype=int), np.empty(0)
+    agreement = (np.stack(hashes) == target).mean(axis=1)
+    return np.argsort(-agreement, kind="stable"), agreement
+
+
+class CardIndex:
+    """
+    Nearest-neighbour lookup of known cards by descriptor.
+
+    Every card image is reduced to a small descriptor once; `nearest` ranks
+    the whole library with one matrix product, so callers only need to
+    template match the few best candidates instead of every card.
+    """
+
+    def __init__(self, card_images=None):
+        self.lock = threading.Lock()
+        self.keys = []
+        self.positions = {}
+        self.descriptors = np.empty((0, DESCRIPTOR_LENGTH), dtype=np.float32)
+        if card_images:
+            self.add_many(card_images)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, key, image):
+        """Index `image` under `key`, replacing any card with that key."""
+        self.add_many({key: image})
+
+    def add_many(self, card_images):
+        self.add_descriptors(
+            {key: card_descriptor(image) for key, image in card_images.items()}
+        )
+
+    def add_descriptors(self, descriptors):
+        """Index precomputed {key: card_descriptor} entries."""
+        with self.lock:
+            new_rows = []
+            for key, descriptor in descriptors.items():
+                position = self.positions.get(key)
+                if position is not None:
+                    self.descriptors[position] = descriptor
+                    continue
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+                new_rows.append(descriptor)
+            if new_rows:
+                self.descriptors = np.vstack([self.descriptors, *new_rows])
+
+    def nearest(self, image, count=5):
+        """Up to `count` (key, correlation) pairs, best first."""
+        with self.lock:
+            if not self.keys:
+                return []
+            similarities = self.descriptors @ card_descriptor(image)
+            count = min(count, len(self.keys))
+            best = np.argpartition(-similarities, count - 1)[:count]
+            best = best[np.argsort(-similarities[best])]
+            return [(self.keys[i], float(similarities[i])) for i in best]
@@ -0,0 +1,165 @@
+# utils/card_store.py
+
+import json
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from utils.card_index import DESCRIPTOR_SIZE, card_descriptor
+from utils.templates import Template
+
+CARD_EXTENSIONS = (".png", ".jpg", ".jpeg")
+MANIFEST_FILE = "descriptors.json"
+DESCRIPTORS_FILE = "descriptors.npy"
+
+
+class CardStore:
+    """
+    The known card images, keyed by file name, with their index descriptors
+    kept on disk next to them.
+
+    A manifest records each card's file mtime and its row in the descriptor
+    array, so a restart only decodes cards added or changed since the store
+    was last saved. Card images themselves are read on first access.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.manifest_path = os.path.join(folder, MANIFEST_FILE)
+        self.descriptors_path = os.path.join(folder, DESCRIPTORS_FILE)
+        self.lock = threading.Lock()
+        self.templates = {}
+        self.mtimes = {}
+        self.descriptors = {}
+        self.scan()
+
+    def scan(self):
+        """List the card files and reuse the stored descriptors still valid."""
+        mtimes = {}
+        if os.path.isdir(self.folder):
+            for entry in os.scandir(self.folder):
+                if entry.is_file() and entry.name.lower().endswith(CARD_EXTENSIONS):
+                    mtimes[entry.name] = entry.stat().st_mtime
+        else:
+            print(f"Directory {self.folder} does not exist.")
+        stored = self._load_stored()
+        with self.lock:
+            self.mtimes = mtimes
+            self.descriptors = {
+                key: descriptor
+                for key, (mtime, descriptor) in stored.items()
+                if mtimes.get(key) == mtime
+            }
+
+    def _load_stored(self):
+        """{file name: (mtime, descriptor)} saved by the last run."""
+        if not (
+            os.path.exists(self.manifest_path) and os.path.exists(self.descriptors_path)
+        ):
+            return {}
+        try:
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if tuple(manifest.get("descriptor_size", ())) != DESCRIPTOR_SIZE:
+                return {}
+            array = np.load(self.descriptors_path)
+            return {
+                key: (entry["mtime"], array[entry["row"]])
+                for key, entry in manifest["cards"].items()
+            }
+        except (OSError, ValueError, KeyError, IndexError) as e:
+            print(f"Failed to load card descriptors: {e}")
+            return {}
+
+    def save(self):
+        with self.lock:
+            keys = sorted(self.descriptors)
+            cards = {
+                key: {"mtime": self.mtimes[key], "row": row}
+                for row, key in enumerate(keys)
+            }
+            array = (
+                np.stack([self.descriptors[key] for key in keys])
+                if keys
+                else np.empty((0, 0), dtype=np.float32)
+            )
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.descriptors_path, "wb") as f:
+            np.save(f, array)
+        with open(self.manifest_path, "w") as f:
+            json.dump(
+                {"descriptor_size": list(DESCRIPTOR_SIZE), "cards": cards}, f, indent=4
+            )
+
+    def load_descriptors(self):
+        """
+        {file name: descriptor} for every card, computing and saving the ones
+        missing from the store.
+        """
+        with self.lock:
+            missing = [key for key in self.mtimes if key not in self.descriptors]
+        for key in missing:
+            template = self.get(key)
+            if template is None:
+                continue
+            with self.lock:
+                self.descriptors[key] = card_descriptor(template)
+        if missing:
+            print(f"Computed descriptors for {len(missing)} new or changed cards")
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Failed to save card descriptors: {e}")
+        with self.lock:
+            return dict(self.descriptors)
+
+    def add(self, card_id, image):
+        """
+        Save `image` as card `card_id` and return its (key, Template). The
+        stored descriptor is updated in place of a full rescan.
+        """
+        key = f"{card_id}.png"
+        path = os.path.join(self.folder, key)
+        os.makedirs(self.folder, exist_ok=True)
+        cv2.imwrite(path, image)
+        template = Template(key, image)
+        with self.lock:
+            self.templates[key] = template
+            self.mtimes[key] = os.path.getmtime(path)
+            self.descriptors[key] = card_descriptor(template)
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Failed to save card descriptors: {e}")
+        return key, template
+
+    def get(self, key, default=None):
+        """The card's Template, reading the image on first access."""
+        with self.lock:
+            template = self.templates.get(key)
+            if template is not None or key not in self.mtimes:
+                return template if template is not None else default
+        image = cv2.imread(os.path.join(self.folder, key))
+        if image is None:
+            print(f"Failed to load image: {key}")
+            return default
+        template = Template(key, image)
+        with self.lock:
+            return self.templates.setdefault(key, template)
+
+    def __getitem__(self, key):
+        template = self.get(key)
+        if template is None:
+            raise KeyError(key)
+        return template
+
+    def __contains__(self, key):
+        return key in self.mtimes
+
+    def __len__(self):
+        return len(self.mtimes)
+
+    def __iter__(self):
+        return iter(list(self.mtimes))
@@ -0,0 +1,105 @@
+# utils/device_profile.py
+
+import threading
+
+import cv2
+
+# Resolution every coordinate, region and template image is authored for
+REFERENCE_WIDTH = 900
+REFERENCE_HEIGHT = 1600
+
+
+def parse_resolution(value):
+    """Parse "450x800" into (450, 800)."""
+    try:
+        width, height = (int(part) for part in str(value).lower().split("x"))
+    except ValueError:
+        raise ValueError(
+            f"Invalid resolution '{value}', expected WIDTHxHEIGHT"
+        ) from None
+    if width <= 0 or height <= 0:
+        raise ValueError(f"Invalid resolution '{value}'")
+    return width, height
+
+
+class DeviceProfile:
+    """
+    Maps the 900x1600 reference layout onto the device's real resolution.
+
+    The code keeps working in reference coordinates; points and regions are
+    converted to device pixels where they meet ADB (input and capture) and
+    template images are rescaled where they meet device frames. `version`
+    changes with every resolution change so scaled images can be rebuilt.
+    """
+
+    def __init__(self, width=REFERENCE_WIDTH, height=REFERENCE_HEIGHT):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.set_resolution(width, height)
+
+    def set_resolution(self, width, height):
+        with self.lock:
+            self.width = width
+            self.height = height
+            self.scale_x = width / REFERENCE_WIDTH
+            self.scale_y = height / REFERENCE_HEIGHT
+            self.version += 1
+
+    @property
+    def is_reference(self):
+        return self.width == REFERENCE_WIDTH and self.height == REFERENCE_HEIGHT
+
+    def point(self, x, y):
+        """Reference coordinates to device pixels."""
+        return round(x * self.scale_x), round(y * self.scale_y)
+
+    def to_reference(self, x, y):
+        """Device pixels to reference coordinates."""
+        return round(x / self.scale_x), round(y / self.scale_y)
+
+    def size(self, width, height):
+        return max(1, round(width * self.scale_x)), max(1, round(height * self.scale_y))
+
+    def region(self, region):
+        """
+        Reference (x, y, w, h) to device pixels. The size is scaled on its
+        own so a region and a template of the same reference size always
+        end up the same size on the device.
+        """
+        if region is None:
+            return None
+        x, y, width, height = region
+        return (*self.point(x, y), *self.size(width, height))
+
+    def crop(self, frame, region):
+        """
+        Crop a reference region out of a device frame, resized to the
+        region's reference size so it compares with reference images.
+        """
+        x, y, width, height = self.region(region)
+        return self.to_reference_image(frame[y : y + height, x : x + width], region[2:])
+
+    def image(self, image):
+        """Resize a reference-resolution image to device resolution."""
+        if self.is_reference:
+            return image
+        height, width = image.shape[:2]
+        return cv2.resize(
+            image, self.size(width, height), interpolation=self._interpolation()
+        )
+
+    def to_reference_image(self, image, reference_size):
+        """Resize a device-resolution image to its (w, h) reference size."""
+        if image.size == 0 or image.shape[1::-1] == tuple(reference_size):
+            return image
+        return cv2.resize(image, reference_size, interpolation=cv2.INTER_LINEAR)
+
+    def _interpolation(self):
+        # INTER_AREA averages properly when shrinking; it is blocky when growing
+        return cv2.INTER_AREA if self.scale_x < 1 else cv2.INTER_LINEAR
+
+
+# Resolution of the connected device
+device_profile = DeviceProfile()
+# Identity mapping, for images already at reference size such as region crops
+reference_profile = DeviceProfile()
@@ -0,0 +1,104 @@
+# utils/frame_change.py
+
+import threading
+
+import cv2
+import numpy as np
+
+
+class FrameChangeDetector:
+    """
+    Cheap per-tile change tracking between consecutive frames.
+
+    Each frame is reduced to a small grayscale thumbnail (one pixel per
+    `block` x `block` screen pixels). A tile counts as changed when any of its
+    thumbnail pixels moved by more than `threshold` grey levels since the
+    tile last changed, so slow fades add up instead of slipping under the
+    threshold frame by frame. Every observed frame bumps a generation
+    counter and each tile remembers the generation it last changed in, so
+    frames with the same last_changed value for a region show the same
+    content there.
+    """
+
+    def __init__(self, block=8, tile_blocks=8, threshold=6):
+        self.block = block
+        self.tile_blocks = tile_blocks
+        self.threshold = threshold
+        self.generation = 0
+        # Thumbnail as of each tile's last change
+        self.reference = None
+        self.tile_generations = None
+        self.last_frame = None
+        self.lock = threading.Lock()
+
+    def observe(self, frame):
+        """
+        Register a frame and return its generation. Passing the same frame
+        object again is free and returns the same generation.
+        """
+        with self.lock:
+            if frame is self.last_frame:
+                return self.generation
+
+            height, width = frame.shape[:2]
+            small = cv2.resize(
+                frame,
+                (max(1, width // self.block), max(1, height // self.block)),
+                interpolation=cv2.INTER_AREA,
+            )
+            if small.ndim == 3:
+                small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+            self.generation += 1
+            tiles_shape = (
+                -(-small.shape[0] // self.tile_blocks),
+                -(-small.shape[1] // self.tile_blocks),
+            )
+            if self.reference is None or self.reference.shape != small.shape:
+                self.tile_generations = np.full(tiles_shape, self.generation)
+                self.reference = small
+            else:
+                diff = cv2.absdiff(small, self.reference)
+                changed_tiles = self._tile_max(diff) > self.threshold
+                self.tile_generations[changed_tiles] = self.generation
+                changed_pixels = np.repeat(
+                    np.repeat(changed_tiles, self.tile_blocks, axis=0),
+                    self.tile_blocks,
+                    axis=1,
+                )[: small.shape[0], : small.shape[1]]
+                self.reference[changed_pixels] = small[changed_pixels]
+
+            self.last_frame = frame
+            return self.generation
+
+    def last_changed(self, region=None):
+        """
+        Generation in which a tile overlapping `region` last changed, or None
+        before the first frame. Frames with the same value show the same
+        content in that region.
+        """
+        with self.lock:
+            if self.tile_generations is None:
+                return None
+            tiles = self.tile_generations[self._tile_slice(region)]
+            return int(tiles.max()) if tiles.size else self.generation
+
+    def _tile_max(self, image):
+        rows, cols = self.tile_generations.shape
+        padded = np.zeros(
+            (rows * self.tile_blocks, cols * self.tile_blocks), dtype=image.dtype
+        )
+        padded[: image.shape[0], : image.shape[1]] = image
+        return padded.reshape(rows, self.tile_blocks, cols, self.tile_blocks).max(
+            axis=(1, 3)
+        )
+
+    def _tile_slice(self, region):
+        if region is None:
+            return slice(None), slice(None)
+        x, y, w, h = region
+        tile_size = self.block * self.tile_blocks
+        return (
+            slice(max(0, y // tile_size), -(-(y + h) // tile_size)),
+            slice(max(0, x // tile_size), -(-(x + w) // tile_size)),
+        )
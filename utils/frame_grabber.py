@@ -0,0 +1,128 @@
+# utils/frame_grabber.py
+
+import threading
+import time
+from collections import deque, namedtuple
+
+from utils.adb_utils import take_screenshot
+
+# timestamp is taken when the capture starts, so a frame "newer than T" shows
+# the screen as it was at some point after T
+Frame = namedtuple("Frame", ["sequence", "timestamp", "image"])
+
+
+class FrameGrabber:
+    """
+    Captures frames on a background thread into a small ring buffer.
+
+    Consumers ask for a frame newer than a given time instead of blocking on
+    a capture of their own, so polling loops see frames as fast as the device
+    produces them.
+    """
+
+    def __init__(self, capture=take_screenshot, buffer_size=4, min_interval=0.05):
+        self.capture = capture
+        self.frames = deque(maxlen=buffer_size)
+        self.min_interval = min_interval
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.sequence = 0
+
+    def start(self):
+        if self.is_running():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.thread = None
+        with self.condition:
+            self.frames.clear()
+            self.condition.notify_all()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def get_frame(self, newer_than=None, timeout=5.0):
+        """
+        Return the latest frame captured after `newer_than` (epoch seconds),
+        waiting up to `timeout` for one to arrive. Returns None on timeout.
+        """
+        deadline = time.time() + timeout
+        with self.condition:
+            while True:
+                frame = self.frames[-1] if self.frames else None
+                if frame is not None and (
+                    newer_than is None or frame.timestamp > newer_than
+                ):
+                    return frame
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.is_running():
+                    return None
+                self.condition.wait(remaining)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            started = time.time()
+            image = self.capture()
+            if image is None:
+                self.stop_event.wait(0.5)
+                continue
+            with self.condition:
+                self.sequence += 1
+                self.frames.append(Frame(self.sequence, started, image))
+                self.condition.notify_all()
+            self.stop_event.wait(max(0.0, self.min_interval - (time.time() - started)))
+
+
+# Shared grabber; GameController runs it while the bot is running
+frame_grabber = FrameGrabber()
+
+
+def next_screenshot(newer_than=None, max_age=None, timeout=5.0):
+    """
+    Screenshot from the frame grabber when it is running, otherwise a direct
+    capture. `max_age` accepts a frame captured up to that many seconds ago.
+    """
+    if not frame_grabber.is_running():
+        return take_screenshot()
+    if max_age is not None:
+        newer_than = max(newer_than or 0.0, time.time() - max_age)
+    frame = frame_grabber.get_frame(newer_than, timeout)
+    return frame.image if frame is not None else None
+
+
+def poll_screenshots(interval, max_polls, running_event=None):
+    """
+    Yield screenshots for a polling loop until the caller stops iterating.
+
+    Without the grabber a fresh screenshot is captured every `interval`
+    seconds, `max_polls` times. With it every new frame is yielded as soon
+    as it lands, within the same `interval * max_polls` time budget.
+    """
+    deadline = time.time() + interval * max_polls
+    last_timestamp = None
+    polls = 0
+    while running_event is None or running_event.is_set():
+        if frame_grabber.is_running():
+            if time.time() >= deadline:
+                return
+            frame = frame_grabber.get_frame(
+                last_timestamp, max(0.0, deadline - time.time())
+            )
+            if frame is None:
+                continue
+            last_timestamp = frame.timestamp
+            yield frame.image
+        else:
+            if polls >= max_polls:
+                return
+            if polls:
+                time.sleep(interval)
+            polls += 1
+            yield take_screenshot()
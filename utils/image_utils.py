@@ -1,23 +1,59 @@
-import time
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import easyocr
-from skimage.metrics import structural_similarity as ssim
 
-from utils.adb_utils import click_position, find_subimage, take_screenshot
+from utils import matching
+from utils.adb_utils import capture_regions, click_position, find_subimage
+from utils.device_profile import device_profile
+from utils.frame_change import FrameChangeDetector
+from utils.frame_grabber import poll_screenshots
+from utils.match_cache import MatchCache
+from utils.matching import prepare_frame
+from utils.similarity import structural_similarity
+
+# Threads used to match templates concurrently; 1 matches them in sequence
+match_workers = os.cpu_count() or 1
+match_executor = None
+
+
+def set_match_workers(workers):
+    global match_workers, match_executor
+    workers = int(workers)
+    if workers < 1:
+        raise ValueError(f"match_workers must be at least 1, got {workers}")
+    match_workers = workers
+    if match_executor is not None:
+        match_executor.shutdown(wait=False)
+        match_executor = None
+
+
+def get_match_executor():
+    """Shared matching thread pool, or None when matching sequentially."""
+    global match_executor
+    if match_workers <= 1:
+        return None
+    if match_executor is None:
+        match_executor = ThreadPoolExecutor(
+            max_workers=match_workers, thread_name_prefix="match"
+        )
+    return match_executor
 
 
 class ImageProcessor:
     def __init__(self, log_callback, debug_window=None):
         self.log_callback = log_callback
         self.debug_window = debug_window
+        self.change_detector = FrameChangeDetector()
+        self.match_cache = MatchCache()
+        self.prepared_frame = None
 
     def reset_view(self):
         click_position(0, 1350)
         click_position(0, 1350)
 
     def get_card(self, x, y, duration=1.0, debug_window=None, debug_message=None):
-        x_zoom_card_region, y_zoom_card_region, w, h = (80, 255, 740, 1020)
         from utils.adb_utils import long_press_position
 
         # Get the screenshot with debug logging
@@ -26,14 +62,9 @@ class ImageProcessor:
         )
 
         # Crop the relevant region
-        card_image = screenshot[
-            y_zoom_card_region : y_zoom_card_region + h,
-            x_zoom_card_region : x_zoom_card_region + w,
-        ]
+        return device_profile.crop(screenshot, (80, 255, 740, 1020))
 
-        return card_image
-
-    def calculate_similarity(self, img1, img2):
+    def calculate_similarity(self, img1, img2, downsample=1):
         # Check if either image is None or empty
         if img1 is None or img2 is None:
             self.log_callback(
@@ -41,7 +72,9 @@ class ImageProcessor:
             )
             return 0
 
-        if img1.size == 0 or img2.size == 0:
+        # Templates carry their grayscale variant precomputed
+        img1, img2 = prepare_frame(img1), prepare_frame(img2)
+        if img1.image.size == 0 or img2.image.size == 0:
             self.log_callback(
                 "Warning: One or both images are empty in calculate_similarity"
             )
@@ -54,10 +87,7 @@ class ImageProcessor:
             return 0
 
         try:
-            img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-            score, _ = ssim(img1_gray, img2_gray, full=True)
-            return score
+            return structural_similarity(img1.gray, img2.gray, downsample=downsample)
         except cv2.error as e:
             self.log_callback(f"OpenCV error in calculate_similarity: {e}")
             return 0
@@ -79,12 +109,112 @@ class ImageProcessor:
         return result
 
     def capture_region(self, region):
-        x, y, w, h = region
-        screenshot = take_screenshot()
-        if screenshot is None:
+        crops = self.capture_regions([region])
+        return crops[0] if crops else None
+
+    def capture_regions(self, regions):
+        crops = capture_regions(regions)
+        if crops is None:
             self.log_callback("Failed to capture screenshot in capture_region")
-            return None
-        return screenshot[y : y + h, x : x + w]
+        return crops
+
+    def find(self, screenshot, template_image, similarity_threshold=None):
+        """
+        find_subimage that reuses the previous result for a template while
+        the region it searches has not changed.
+        """
+        results = self.find_many(screenshot, [template_image], similarity_threshold)
+        return next(iter(results.values()))
+
+    def find_many(self, screenshot, templates, similarity_threshold=None):
+        """
+        Match several templates against one screenshot, converting the frame
+        once for all of them. Returns {template index or name: (position,
+        similarity)}; with `similarity_threshold` it stops at the first hit.
+        """
+        self.change_detector.observe(screenshot)
+        frame = self._prepare(screenshot)
+        lookups = []
+        for key, template_image in (
+            templates.items() if isinstance(templates, dict) else enumerate(templates)
+        ):
+            cache_key = self._cache_key(template_image, similarity_threshold)
+            cached = (
+                None
+                if self._full_search_due(template_image)
+                else self.match_cache.get(cache_key, template_image)
+            )
+            lookups.append((key, template_image, cache_key, cached))
+        matches = self._map_matches(
+            frame,
+            [template for _, template, _, cached in lookups if cached is None],
+            similarity_threshold,
+        )
+        results = {}
+        for key, template_image, cache_key, cached in lookups:
+            self.match_cache.record(hit=cached is not None)
+            if cached is None:
+                cached = next(matches)
+                self.match_cache.put(cache_key, template_image, cached)
+            results[key] = cached
+            similarity = cached[1]
+            if similarity_threshold is not None and similarity > similarity_threshold:
+                break
+        return results
+
+    def _cache_key(self, template_image, similarity_threshold=None):
+        """
+        Match cache key: the template, the region it searches and the frame
+        generation that region last changed in, which identifies its content.
+        Early-exit results depend on the threshold they stopped at, so it is
+        part of the key with that matcher.
+        """
+        region = getattr(template_image, "search_region", None)
+        return (
+            getattr(template_image, "name", id(template_image)),
+            region,
+            self.change_detector.last_changed(device_profile.region(region)),
+            similarity_threshold if matching.matcher == "early_exit" else None,
+        )
+
+    @staticmethod
+    def _full_search_due(template_image):
+        """
+        Cached results of anchored templates only cover their window; once
+        the periodic full-frame search is due they are bypassed so a moved
+        element is found and its anchor relearned.
+        """
+        full_search_due = getattr(template_image, "full_search_due", None)
+        return full_search_due is not None and full_search_due()
+
+    def _map_matches(self, frame, templates, similarity_threshold=None):
+        """Iterator of find_subimage results for `templates`, in order."""
+
+        def find(template):
+            return find_subimage(frame, template, similarity_threshold)
+
+        executor = get_match_executor()
+        if executor is None or len(templates) < 2:
+            return (find(template) for template in templates)
+        return executor.map(find, templates)
+
+    def check_any(self, screenshot, templates, similarity_threshold=0.8):
+        """True as soon as one of `templates` is found in the screenshot."""
+        if screenshot is None:
+            self.log_callback("Screenshot is None in check_any method")
+            return False
+        results = self.find_many(screenshot, templates, similarity_threshold)
+        return any(
+            similarity > similarity_threshold for _, similarity in results.values()
+        )
+
+    def _prepare(self, screenshot):
+        # Read the shared slot once: another thread may replace it meanwhile
+        prepared = self.prepared_frame
+        if prepared is None or prepared.image is not screenshot:
+            prepared = prepare_frame(screenshot)
+            self.prepared_frame = prepared
+        return prepared
 
     def check(
         self, screenshot, template_image, log_message=None, similarity_threshold=0.8
@@ -92,7 +222,7 @@ class ImageProcessor:
         if screenshot is None:
             self.log_callback("Screenshot is None in check method")
             return False
-        _, similarity = find_subimage(screenshot, template_image)
+        _, similarity = self.find(screenshot, template_image, similarity_threshold)
         if log_message:
             log_message = (
                 f"{log_message} found - {similarity:.2f}"
@@ -110,18 +240,16 @@ class ImageProcessor:
         similarity_threshold=0.8,
         max_attempts=50,
     ):
-        attempts = 0
-
         self.log_callback(f"Searching... {log_message}")
-        while running_event.is_set():
-            screenshot = take_screenshot()
+        for screenshot in poll_screenshots(0.5, max_attempts, running_event):
             if screenshot is None:
                 self.log_callback(
                     "Failed to take screenshot in check_and_click_until_found"
                 )
-                time.sleep(0.5)
                 continue
-            position, similarity = find_subimage(screenshot, template_image)
+            position, similarity = self.find(
+                screenshot, template_image, similarity_threshold
+            )
 
             if similarity > similarity_threshold:
                 self.log_and_click(
@@ -131,14 +259,12 @@ class ImageProcessor:
                 )
                 self.log_callback(f"✅ {log_message} found")
                 return True
-            else:
-                attempts += 1
-                if attempts >= max_attempts:
-                    self.log_callback(
-                        f"❌ Max attempts reached. {log_message} not found. Stopping the bot."
-                    )
-                    return False
-                time.sleep(0.5)
+
+        if running_event.is_set():
+            self.log_callback(
+                f"❌ Max attempts reached. {log_message} not found. Stopping the bot."
+            )
+            return False
 
     def check_and_click(
         self, screenshot, template_image, log_message=None, similarity_threshold=0.8
@@ -146,7 +272,9 @@ class ImageProcessor:
         if screenshot is None:
             self.log_callback("Screenshot is None in check_and_click")
             return False
-        position, similarity = find_subimage(screenshot, template_image)
+        position, similarity = self.find(
+            screenshot, template_image, similarity_threshold
+        )
         if similarity > similarity_threshold:
             if log_message:
                 self.log_and_click(
@@ -2,8 +2,15 @@ import os
 
 import cv2
 
+from utils.card_store import CardStore
+from utils.templates import Template
 
-def load_template_images(template_folder):
+
+def load_template_images(template_folder, anchors=None):
+    """
+    Load the UI templates as Template objects keyed by upper-case name.
+    `anchors` (a TemplateAnchors) limits their search to learned regions.
+    """
     template_images = {}
 
     if not os.path.exists(template_folder):
@@ -16,7 +23,7 @@ def load_template_images(template_folder):
             image = cv2.imread(file_path)
             if image is not None:
                 template_name = os.path.splitext(filename)[0].upper()
-                template_images[template_name] = image
+                template_images[template_name] = Template(template_name, image, anchors)
                 print(f"Loaded template: {template_name}")
             else:
                 print(f"Failed to load template: {file_path}")
@@ -24,21 +31,20 @@ def load_template_images(template_folder):
     return template_images
 
 
-def load_all_cards(image_folder):
-    card_images = {}
+def load_template(file_path, name=None, anchors=None):
+    """Load a single image as a Template, or None if it cannot be read."""
+    image = cv2.imread(file_path)
+    if image is None:
+        print(f"Failed to load template: {file_path}")
+        return None
+    if name is None:
+        name = os.path.splitext(os.path.basename(file_path))[0].upper()
+    return Template(name, image, anchors)
 
-    if not os.path.exists(image_folder):
-        print(f"Directory {image_folder} does not exist.")
-        return card_images
 
-    for filename in os.listdir(image_folder):
-        if filename.endswith((".png", ".jpg", ".jpeg")):
-            file_path = os.path.join(image_folder, filename)
-            image = cv2.imread(file_path)
-            if image is not None:
-                card_images[filename] = image
-                print(f"Loaded image: {filename}")
-            else:
-                print(f"Failed to load image: {file_path}")
-
-    return card_images
+def load_all_cards(image_folder):
+    """
+    The known card images as a CardStore of Templates keyed by file name.
+    Images are read on first use; their descriptors come from the store.
+    """
+    return CardStore(image_folder)
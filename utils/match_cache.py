@@ -0,0 +1,63 @@
+# utils/match_cache.py
+
+import threading
+from collections import OrderedDict
+
+
+class MatchCache:
+    """
+    LRU cache of template match results.
+
+    Keys identify what was matched: the template, the region searched and
+    the content of that region (see ImageProcessor.find_many). Values are
+    (position, similarity). Hit and miss counters show how much matching
+    the cache saves.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, template):
+        """Cached result for `key`, or None. Does not update the counters."""
+        with self.lock:
+            entry = self.entries.get(key)
+            # Keys may use id(template); make sure it is still the same object
+            if entry is None or entry[0] is not template:
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, template, result):
+        with self.lock:
+            self.entries[key] = (template, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def record(self, hit):
+        with self.lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
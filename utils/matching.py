@@ -0,0 +1,375 @@
+# utils/matching.py
+
+import glob
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+MATCHERS = ("full", "pyramid", "early_exit")
+matcher = "full"
+
+# Coarse levels tried by the pyramid matcher, largest first
+PYRAMID_SCALES = (8, 4, 2)
+# Smallest template side (px) still matched at a coarse level
+PYRAMID_MIN_TEMPLATE_SIDE = 8
+# Coarse peaks refined at full resolution
+PYRAMID_CANDIDATES = 3
+
+# Side of an early-exit tile, in match positions, per template side
+EARLY_EXIT_TILE_FACTOR = 2
+# Smallest tile side (positions) the early-exit matcher splits the search into
+EARLY_EXIT_MIN_TILE = 64
+
+
+def set_matcher(name):
+    global matcher
+    if name not in MATCHERS:
+        raise ValueError(f"Unknown matcher '{name}', expected one of {MATCHERS}")
+    matcher = name
+
+
+class PreparedFrame:
+    """
+    A screenshot converted once for matching against many templates.
+
+    Matching runs on the 8-bit image itself; only the grayscale and
+    downscaled variants are derived, once per frame, and cached.
+    """
+
+    def __init__(self, image):
+        self.image = image
+        self._gray = None
+        self._scaled = {}
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            if self.image.ndim == 2:
+                self._gray = self.image
+            else:
+                self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    def scaled(self, scale):
+        """The image shrunk by an integer factor, cached per scale."""
+        if scale not in self._scaled:
+            self._scaled[scale] = downscale(self.image, scale)
+        return self._scaled[scale]
+
+
+class EarlyExitStats:
+    """
+    How much work the early-exit matcher saves: match positions (candidate
+    top-left corners) evaluated and skipped, and how many searches stopped
+    before covering their whole search area.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.searches = 0
+            self.early_exits = 0
+            self.positions_searched = 0
+            self.positions_skipped = 0
+
+    def record(self, searched, skipped):
+        with self.lock:
+            self.searches += 1
+            self.early_exits += skipped > 0
+            self.positions_searched += searched
+            self.positions_skipped += skipped
+
+    def stats(self):
+        with self.lock:
+            total = self.positions_searched + self.positions_skipped
+            return {
+                "searches": self.searches,
+                "early_exits": self.early_exits,
+                "positions_searched": self.positions_searched,
+                "positions_skipped": self.positions_skipped,
+                "skipped_ratio": self.positions_skipped / total if total else None,
+            }
+
+
+early_exit_stats = EarlyExitStats()
+
+
+def prepare_frame(screenshot):
+    if isinstance(screenshot, PreparedFrame):
+        return screenshot
+    return PreparedFrame(screenshot)
+
+
+def downscale(image, scale):
+    """Average `scale` x `scale` blocks, dropping any partial edge blocks."""
+    height = image.shape[0] // scale
+    width = image.shape[1] // scale
+    image = image[: height * scale, : width * scale]
+    return cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+
+
+def pyramid_scale(template_shape):
+    """Coarsest pyramid level usable for a template, or None if too small."""
+    for scale in PYRAMID_SCALES:
+        if min(template_shape[:2]) // scale >= PYRAMID_MIN_TEMPLATE_SIDE:
+            return scale
+    return None
+
+
+def match_template(
+    screenshot, template, region=None, method=None, threshold=None, hint=None
+):
+    """
+    TM_CCOEFF_NORMED match of `template` over `screenshot` (images or
+    PreparedFrames, e.g. Templates), optionally limited to `region` (x, y, w, h). Returns
+    (max_loc, max_val) like find_subimage, in full-frame coordinates.
+
+    `method` overrides the configured matcher ("full", "pyramid" or
+    "early_exit"). The early-exit matcher needs the caller's `threshold`
+    and starts searching around `hint` (x, y), where the template was last
+    seen; without a threshold it matches like "full". "coarse" only scores
+    the template's coarsest pyramid level, for choosing between a few
+    shortlisted templates when the exact position does not matter.
+    """
+    frame = prepare_frame(screenshot)
+    template = prepare_frame(template)
+    method = method or matcher
+    if method == "pyramid":
+        scale = pyramid_scale(template.shape)
+        if scale is not None:
+            return _match_pyramid(frame, template, region, scale)
+    elif method == "early_exit" and threshold is not None:
+        return _match_early_exit(frame, template, region, threshold, hint)
+    elif method == "coarse":
+        scale = pyramid_scale(template.shape)
+        if scale is not None:
+            return _match_coarse(frame, template, region, scale)
+    return _match_full(frame, template, region)
+
+
+def _match_full(frame, template, region):
+    image = frame.image
+    x, y = 0, 0
+    if region is not None:
+        x, y, w, h = region
+        image = image[y : y + h, x : x + w]
+        if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+            return (x, y), 0.0
+    result = cv2.matchTemplate(image, template.image, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return (max_loc[0] + x, max_loc[1] + y), max_val
+
+
+def _match_coarse(frame, template, region, scale):
+    """Match at 1/`scale` resolution, returning a full-resolution position."""
+    x, y = 0, 0
+    if region is None:
+        image = frame.scaled(scale)
+    else:
+        x, y, w, h = region
+        image = downscale(frame.image[y : y + h, x : x + w], scale)
+    coarse_template = template.scaled(scale)
+    if (
+        image.shape[0] < coarse_template.shape[0]
+        or image.shape[1] < coarse_template.shape[1]
+    ):
+        return (x, y), 0.0
+    result = cv2.matchTemplate(image, coarse_template, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return (max_loc[0] * scale + x, max_loc[1] * scale + y), max_val
+
+
+def _match_pyramid(frame, template, region, scale):
+    """
+    Coarse-to-fine match: find the best few peaks at 1/`scale` resolution,
+    then re-match a small window around each at full resolution. The score
+    returned is the full-resolution TM_CCOEFF_NORMED value at the returned
+    position, so thresholds mean the same as with the full matcher.
+    """
+    image = frame.image
+    x, y = 0, 0
+    if region is None:
+        coarse_image = frame.scaled(scale)
+    else:
+        x, y, w, h = region
+        image = image[y : y + h, x : x + w]
+        coarse_image = downscale(image, scale)
+    coarse_template = template.scaled(scale)
+    if (
+        coarse_image.shape[0] < coarse_template.shape[0]
+        or coarse_image.shape[1] < coarse_template.shape[1]
+    ):
+        return _match_full(frame, template, region)
+
+    result = cv2.matchTemplate(coarse_image, coarse_template, cv2.TM_CCOEFF_NORMED)
+    template_h, template_w = template.shape[:2]
+    suppress_h = coarse_template.shape[0] // 2
+    suppress_w = coarse_template.shape[1] // 2
+    best_loc, best_val = (0, 0), -1.0
+    for _ in range(PYRAMID_CANDIDATES):
+        _, coarse_val, _, (coarse_x, coarse_y) = cv2.minMaxLoc(result)
+        if coarse_val == -np.inf:
+            break
+        # Suppress this peak's neighbourhood so the next candidate is distinct
+        result[
+            max(0, coarse_y - suppress_h) : coarse_y + suppress_h + 1,
+            max(0, coarse_x - suppress_w) : coarse_x + suppress_w + 1,
+        ] = -np.inf
+
+        left = max(0, coarse_x * scale - scale)
+        top = max(0, coarse_y * scale - scale)
+        right = min(image.shape[1], coarse_x * scale + scale + template_w)
+        bottom = min(image.shape[0], coarse_y * scale + scale + template_h)
+        if right - left < template_w or bottom - top < template_h:
+            continue
+        refined = cv2.matchTemplate(
+            image[top:bottom, left:right], template.image, cv2.TM_CCOEFF_NORMED
+        )
+        _, max_val, _, max_loc = cv2.minMaxLoc(refined)
+        if max_val > best_val:
+            best_loc, best_val = (max_loc[0] + left, max_loc[1] + top), max_val
+    return (best_loc[0] + x, best_loc[1] + y), best_val
+
+
+def _match_early_exit(frame, template, region, threshold, hint):
+    """
+    Match tile by tile, nearest tile to `hint` first, and stop at the first
+    tile whose best score passes `threshold`. Tiles overlap by the template
+    size so every position is scored exactly as by the full matcher; on a
+    miss all tiles are searched and the result is the full-frame maximum.
+    """
+    image = frame.image
+    x, y = 0, 0
+    if region is not None:
+        x, y, w, h = region
+        image = image[y : y + h, x : x + w]
+    template_h, template_w = template.shape[:2]
+    rows = image.shape[0] - template_h + 1
+    cols = image.shape[1] - template_w + 1
+    if rows <= 0 or cols <= 0:
+        return (x, y), 0.0
+
+    tile = max(
+        EARLY_EXIT_MIN_TILE, EARLY_EXIT_TILE_FACTOR * max(template_h, template_w)
+    )
+    tiles = [
+        (top, left, min(tile, rows - top), min(tile, cols - left))
+        for top in range(0, rows, tile)
+        for left in range(0, cols, tile)
+    ]
+    if hint is not None:
+        hint = (hint[0] - x, hint[1] - y)
+        tiles.sort(key=lambda t: _tile_distance(t, hint))
+
+    best_loc, best_val = (0, 0), -1.0
+    searched = 0
+    for top, left, tile_rows, tile_cols in tiles:
+        result = cv2.matchTemplate(
+            image[
+                top : top + tile_rows + template_h - 1,
+                left : left + tile_cols + template_w - 1,
+            ],
+            template.image,
+            cv2.TM_CCOEFF_NORMED,
+        )
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        searched += tile_rows * tile_cols
+        if max_val > best_val:
+            best_loc, best_val = (max_loc[0] + left, max_loc[1] + top), max_val
+        if best_val > threshold:
+            break
+    early_exit_stats.record(searched, rows * cols - searched)
+    return (best_loc[0] + x, best_loc[1] + y), best_val
+
+
+def _tile_distance(tile, point):
+    """Squared distance from (x, y) `point` to a (top, left, rows, cols) tile."""
+    top, left, rows, cols = tile
+    dy = max(top - point[1], 0, point[1] - (top + rows - 1))
+    dx = max(left - point[0], 0, point[0] - (left + cols - 1))
+    return dx * dx + dy * dy
+
+
+def _time_match(screenshot, template, method, repeats):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        result = match_template(PreparedFrame(screenshot), template, method=method)
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, min(timings)
+
+
+def benchmark(
+    template_folder="images",
+    screenshot_path="images/screenshot.png",
+    repeats=5,
+    thresholds=(0.5, 0.7, 0.8),
+):
+    """
+    Compare the full and pyramid matchers on every template in
+    `template_folder`, once pasted into the screenshot (hit) and once against
+    the untouched screenshot (miss).
+    """
+    screenshot = cv2.imread(screenshot_path)
+    if screenshot is None:
+        print(f"Could not read {screenshot_path}")
+        return
+    paths = sorted(glob.glob(os.path.join(template_folder, "*.PNG")))
+    print(
+        f"{'template':<28}{'full ms':>9}{'pyr ms':>9}{'speedup':>9}"
+        f"{'hit full':>10}{'hit pyr':>9}{'miss full':>11}{'miss pyr':>10}"
+    )
+    total_full = total_pyramid = 0.0
+    disagreements = 0
+    for path in paths:
+        template = PreparedFrame(cv2.imread(path))
+        name = os.path.splitext(os.path.basename(path))[0]
+        height, width = template.shape[:2]
+        # Paste off the coarse grid so refinement has to recover the offset
+        x = (screenshot.shape[1] - width) // 2 + 3
+        y = (screenshot.shape[0] - height) // 3 + 5
+        hit_frame = screenshot.copy()
+        hit_frame[y : y + height, x : x + width] = template.image
+
+        (full_hit_loc, full_hit), full_ms = _time_match(
+            hit_frame, template, "full", repeats
+        )
+        (pyr_hit_loc, pyr_hit), pyr_ms = _time_match(
+            hit_frame, template, "pyramid", repeats
+        )
+        (_, full_miss), _ = _time_match(screenshot, template, "full", 1)
+        (_, pyr_miss), _ = _time_match(screenshot, template, "pyramid", 1)
+        total_full += full_ms
+        total_pyramid += pyr_ms
+
+        for threshold in thresholds:
+            if (full_hit > threshold) != (pyr_hit > threshold) or (
+                full_miss > threshold
+            ) != (pyr_miss > threshold):
+                disagreements += 1
+        if full_hit_loc != pyr_hit_loc:
+            disagreements += 1
+        print(
+            f"{name:<28}{full_ms:>9.2f}{pyr_ms:>9.2f}{full_ms / pyr_ms:>8.1f}x"
+            f"{full_hit:>10.4f}{pyr_hit:>9.4f}{full_miss:>11.4f}{pyr_miss:>10.4f}"
+        )
+    if paths:
+        print(
+            f"Total: full {total_full:.1f} ms, pyramid {total_pyramid:.1f} ms "
+            f"({total_full / total_pyramid:.1f}x), "
+            f"{disagreements} threshold/location disagreements"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
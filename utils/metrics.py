@@ -0,0 +1,185 @@
+# utils/metrics.py
+
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (ms) of the latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        """Bucket upper bound below which `q` of the observations fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum_ms": self.sum,
+            "mean_ms": self.sum / self.count if self.count else None,
+            "min_ms": self.min,
+            "max_ms": self.max,
+            "p50_ms": self.quantile(0.5),
+            "p95_ms": self.quantile(0.95),
+            "buckets": {
+                **{
+                    str(bound): count for bound, count in zip(self.buckets, self.counts)
+                },
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    Per-operation latency histograms and error, timeout and byte counters.
+
+    Operations are tracked with `track(op)` (or the `timed` decorator);
+    anything recorded through `add_bytes` / `count_timeout` while an
+    operation is active on the current thread is attributed to it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.latencies = {}
+            self.calls = {}
+            self.errors = {}
+            self.timeouts = {}
+            self.bytes = {}
+
+    @contextmanager
+    def track(self, op):
+        stack = self._op_stack()
+        stack.append(op)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.count_error(op)
+            raise
+        finally:
+            stack.pop()
+            self.observe_latency(op, (time.perf_counter() - started) * 1000)
+
+    def timed(self, op, none_is_error=False):
+        """Decorator tracking every call of a function as `op`."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.track(op):
+                    result = func(*args, **kwargs)
+                if none_is_error and result is None:
+                    self.count_error(op)
+                return result
+
+            return wrapper
+
+        return decorator
+
+    def observe_latency(self, op, latency_ms):
+        with self.lock:
+            self.latencies.setdefault(op, Histogram()).observe(latency_ms)
+            self.calls[op] = self.calls.get(op, 0) + 1
+
+    def count_error(self, op=None):
+        self._increment(self.errors, op)
+
+    def count_timeout(self, op=None):
+        self._increment(self.timeouts, op)
+
+    def add_bytes(self, amount, op=None):
+        self._increment(self.bytes, op, amount)
+
+    def snapshot(self):
+        with self.lock:
+            ops = sorted(
+                set(self.latencies)
+                | set(self.errors)
+                | set(self.timeouts)
+                | set(self.bytes)
+            )
+            return {
+                op: {
+                    "calls": self.calls.get(op, 0),
+                    "errors": self.errors.get(op, 0),
+                    "timeouts": self.timeouts.get(op, 0),
+                    "bytes": self.bytes.get(op, 0),
+                    "latency": (self.latencies.get(op) or Histogram()).to_dict(),
+                }
+                for op in ops
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=4)
+
+    def to_prometheus(self, prefix="adb"):
+        snapshot = self.snapshot()
+        lines = [f"# TYPE {prefix}_latency_ms histogram"]
+        for op, stats in snapshot.items():
+            latency = stats["latency"]
+            cumulative = 0
+            for bound, count in latency["buckets"].items():
+                cumulative += count
+                lines.append(
+                    f'{prefix}_latency_ms_bucket{{op="{op}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{prefix}_latency_ms_sum{{op="{op}"}} {latency["sum_ms"]}')
+            lines.append(f'{prefix}_latency_ms_count{{op="{op}"}} {latency["count"]}')
+        for name in ("calls", "errors", "timeouts", "bytes"):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for op, stats in snapshot.items():
+                lines.append(f'{prefix}_{name}_total{{op="{op}"}} {stats[name]}')
+        return "\n".join(lines) + "\n"
+
+    def _op_stack(self):
+        if not hasattr(self.local, "ops"):
+            self.local.ops = []
+        return self.local.ops
+
+    def _increment(self, counters, op, amount=1):
+        if op is None:
+            stack = self._op_stack()
+            op = stack[-1] if stack else "other"
+        with self.lock:
+            counters[op] = counters.get(op, 0) + amount
+
+
+# Shared registry for the ADB layer
+adb_metrics = MetricsRegistry()
@@ -0,0 +1,131 @@
+# utils/screen_classifier.py
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SCREENS_FOLDER = os.path.join("images", "screens")
+# Width and height frames are shrunk to before comparing (9:16 like the screen)
+FINGERPRINT_SIZE = (18, 32)
+
+# Screen shown while a match is being played
+IN_BATTLE = "IN_BATTLE"
+
+
+def fingerprint(frame):
+    """
+    Tiny grayscale thumbnail of a frame as a zero-mean, unit-length vector,
+    so the dot product of two fingerprints is their correlation.
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(frame, FINGERPRINT_SIZE, interpolation=cv2.INTER_AREA)
+    vector = small.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class ScreenClassifier:
+    """
+    Nearest-neighbour screen recognition over frame fingerprints.
+
+    Labelled captures live in SCREENS_FOLDER/<screen id>/*.png, where the
+    screen id is usually the name of the template that screen is checked
+    for (e.g. NEXT_BUTTON) or IN_BATTLE. `identify` only answers when the
+    nearest sample is close enough and clearly closer than any sample of a
+    different screen; otherwise callers fall back to template matching.
+    """
+
+    def __init__(self, folder=SCREENS_FOLDER, min_confidence=0.95, min_margin=0.02):
+        self.folder = folder
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.lock = threading.Lock()
+        self.labels = []
+        self.fingerprints = np.empty((0, FINGERPRINT_SIZE[0] * FINGERPRINT_SIZE[1]))
+        self.last_frame = None
+        self.last_result = None
+        self.load()
+
+    def load(self):
+        labels, fingerprints = [], []
+        if os.path.isdir(self.folder):
+            for screen_id in sorted(os.listdir(self.folder)):
+                screen_folder = os.path.join(self.folder, screen_id)
+                if not os.path.isdir(screen_folder):
+                    continue
+                for filename in sorted(os.listdir(screen_folder)):
+                    if not filename.lower().endswith((".png", ".jpg", ".jpeg")):
+                        continue
+                    image = cv2.imread(os.path.join(screen_folder, filename))
+                    if image is None:
+                        print(f"Failed to load screen sample: {filename}")
+                        continue
+                    labels.append(screen_id)
+                    fingerprints.append(fingerprint(image))
+        with self.lock:
+            self.labels = labels
+            if fingerprints:
+                self.fingerprints = np.stack(fingerprints)
+            self.last_frame = None
+        if labels:
+            print(f"Loaded {len(labels)} screen samples for {len(set(labels))} screens")
+
+    @property
+    def screen_ids(self):
+        return sorted(set(self.labels))
+
+    def add_sample(self, frame, screen_id):
+        """Save `frame` as a labelled capture and learn it immediately."""
+        screen_folder = os.path.join(self.folder, screen_id)
+        os.makedirs(screen_folder, exist_ok=True)
+        path = os.path.join(screen_folder, f"{int(time.time() * 1000)}.png")
+        cv2.imwrite(path, frame)
+        with self.lock:
+            self.labels.append(screen_id)
+            self.fingerprints = np.vstack([self.fingerprints, fingerprint(frame)])
+            self.last_frame = None
+        return path
+
+    def classify(self, frame):
+        """(screen id, confidence) of the nearest sample, or (None, 0.0)."""
+        screen_id, confidence, _ = self._nearest(frame)
+        return screen_id, confidence
+
+    def identify(self, frame):
+        """Screen id of `frame` if it is recognised confidently, else None."""
+        if frame is None:
+            return None
+        screen_id, confidence, margin = self._nearest(frame)
+        if confidence < self.min_confidence or margin < self.min_margin:
+            return None
+        return screen_id
+
+    def _nearest(self, frame):
+        """
+        Nearest sample's screen id and similarity, and how much closer it is
+        than the nearest sample of any other screen. Cached for the last frame
+        since several checks usually classify the same one.
+        """
+        with self.lock:
+            if frame is self.last_frame:
+                return self.last_result
+            if not self.labels:
+                return None, 0.0, 0.0
+            similarities = self.fingerprints @ fingerprint(frame)
+            best = int(np.argmax(similarities))
+            screen_id = self.labels[best]
+            others = [
+                similarity
+                for label, similarity in zip(self.labels, similarities)
+                if label != screen_id
+            ]
+            confidence = float(similarities[best])
+            margin = confidence - (float(max(others)) if others else -1.0)
+            self.last_frame = frame
+            self.last_result = (screen_id, confidence, margin)
+            return self.last_result
@@ -0,0 +1,157 @@
+# utils/screen_stream.py
+
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+# screenrecord refuses to run longer than this, so the stream is restarted
+SCREENRECORD_TIME_LIMIT = 180
+
+
+class ScreenRecordStream:
+    """
+    Continuous screen capture from `screenrecord --output-format=h264`.
+
+    The device's H.264 stream is piped from `adb exec-out` into ffmpeg, which
+    decodes it into raw BGR frames on its stdout. A reader thread keeps only
+    the newest decoded frame, so reading a frame costs a lock instead of a
+    full screencap round-trip.
+
+    screenrecord only emits frames when the screen changes, so on a static
+    screen the latest frame stays current until something moves.
+    """
+
+    def __init__(
+        self,
+        width=900,
+        height=1600,
+        bit_rate=8000000,
+        adb_path="adb",
+        ffmpeg_path="ffmpeg",
+    ):
+        self.width = width
+        self.height = height
+        self.bit_rate = bit_rate
+        self.adb_path = adb_path
+        self.ffmpeg_path = ffmpeg_path
+        self.frame = None
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.processes = []
+
+    def start(self):
+        if self.is_running():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self._kill_processes()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.thread = None
+        with self.condition:
+            self.frame = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def latest_frame(self, timeout=5.0):
+        """Return the newest decoded frame, waiting for the first one."""
+        self.start()
+        deadline = time.time() + timeout
+        with self.condition:
+            while self.frame is None:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.is_running():
+                    return None
+                self.condition.wait(min(remaining, 0.5))
+            return self.frame
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self._stream_frames()
+            except FileNotFoundError as e:
+                print(f"Screen stream unavailable, {e.filename} not found")
+                return
+            except Exception as e:
+                print(f"Screen stream error: {e}")
+            finally:
+                self._kill_processes()
+            # screenrecord hit its time limit or the device went away
+            self.stop_event.wait(0.5)
+
+    def _stream_frames(self):
+        recorder = subprocess.Popen(
+            [
+                self.adb_path,
+                "exec-out",
+                "screenrecord",
+                "--output-format=h264",
+                f"--size={self.width}x{self.height}",
+                f"--bit-rate={self.bit_rate}",
+                f"--time-limit={SCREENRECORD_TIME_LIMIT}",
+                "-",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self.processes = [recorder]
+        decoder = subprocess.Popen(
+            [
+                self.ffmpeg_path,
+                "-loglevel",
+                "error",
+                "-fflags",
+                "nobuffer",
+                "-flags",
+                "low_delay",
+                "-probesize",
+                "32",
+                "-f",
+                "h264",
+                "-i",
+                "pipe:0",
+                "-f",
+                "rawvideo",
+                "-pix_fmt",
+                "bgr24",
+                "pipe:1",
+            ],
+            stdin=recorder.stdout,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        # The decoder owns the pipe now; closing our copy lets the recorder
+        # see EOF/SIGPIPE if the decoder dies
+        recorder.stdout.close()
+        self.processes.append(decoder)
+
+        frame_size = self.width * self.height * 3
+        while not self.stop_event.is_set():
+            buffer = bytearray(frame_size)
+            view = memoryview(buffer)
+            received = 0
+            while received < frame_size:
+                count = decoder.stdout.readinto(view[received:])
+                if not count:
+                    return
+                received += count
+            frame = np.frombuffer(buffer, dtype=np.uint8).reshape(
+                self.height, self.width, 3
+            )
+            with self.condition:
+                self.frame = frame
+                self.condition.notify_all()
+
+    def _kill_processes(self):
+        processes, self.processes = self.processes, []
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
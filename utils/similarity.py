@@ -0,0 +1,102 @@
+# utils/similarity.py
+
+import cv2
+import numpy as np
+
+from utils.matching import downscale
+
+# Same constants as skimage.metrics.structural_similarity's defaults
+SSIM_WINDOW = 7
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+
+
+def structural_similarity(img1, img2, data_range=255, downsample=1):
+    """
+    Mean SSIM of two equally sized grayscale images.
+
+    Matches skimage's structural_similarity defaults (7x7 uniform window,
+    sample covariance, border of half a window excluded) but computes the
+    local statistics with OpenCV box filters and returns only the scalar
+    instead of building the full similarity map. `downsample` averages
+    blocks of that size first, trading accuracy for speed.
+    """
+    img1 = img1.astype(np.float32)
+    img2 = img2.astype(np.float32)
+    if downsample > 1:
+        img1 = downscale(img1, downsample)
+        img2 = downscale(img2, downsample)
+    if min(img1.shape[:2]) < SSIM_WINDOW:
+        raise ValueError(
+            f"Images of shape {img1.shape} are smaller than the "
+            f"{SSIM_WINDOW}x{SSIM_WINDOW} SSIM window"
+        )
+
+    window = (SSIM_WINDOW, SSIM_WINDOW)
+    mu1 = cv2.boxFilter(img1, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu2 = cv2.boxFilter(img2, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu11 = cv2.boxFilter(img1 * img1, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu22 = cv2.boxFilter(img2 * img2, -1, window, borderType=cv2.BORDER_REFLECT)
+    mu12 = cv2.boxFilter(img1 * img2, -1, window, borderType=cv2.BORDER_REFLECT)
+
+    # Sample rather than population covariance, as skimage does by default
+    cov_norm = SSIM_WINDOW**2 / (SSIM_WINDOW**2 - 1)
+    var1 = cov_norm * (mu11 - mu1 * mu1)
+    var2 = cov_norm * (mu22 - mu2 * mu2)
+    cov12 = cov_norm * (mu12 - mu1 * mu2)
+
+    c1 = (SSIM_K1 * data_range) ** 2
+    c2 = (SSIM_K2 * data_range) ** 2
+    ssim_map = ((2 * mu1 * mu2 + c1) * (2 * cov12 + c2)) / (
+        (mu1 * mu1 + mu2 * mu2 + c1) * (var1 + var2 + c2)
+    )
+
+    pad = (SSIM_WINDOW - 1) // 2
+    return float(ssim_map[pad:-pad, pad:-pad].mean())
+
+
+def compare_with_skimage(screenshot_path="images/screenshot.png", tolerance=1e-4):
+    """
+    Check structural_similarity against skimage on crops of a captured frame
+    and print both scores and timings. Returns True if every score is within
+    `tolerance`.
+    """
+    import time
+
+    from skimage.metrics import structural_similarity as skimage_ssim
+
+    screenshot = cv2.imread(screenshot_path)
+    if screenshot is None:
+        print(f"Could not read {screenshot_path}")
+        return False
+    frame = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+    noise = np.random.default_rng(0).integers(0, 256, frame.shape, dtype=np.uint8)
+    log_region = frame[1153:1211, 225:666]
+    cases = {
+        "identical": (log_region, log_region.copy()),
+        "shifted crop": (log_region, frame[1160:1218, 225:666]),
+        "turn check region": (frame[1560:1580, 50:250], frame[1561:1581, 50:250]),
+        "full frame, 2px shift": (frame, np.roll(frame, 2, axis=1)),
+        "full frame vs noise": (frame, noise),
+        "brightened": (log_region, cv2.add(log_region, 40)),
+    }
+
+    passed = True
+    for name, (img1, img2) in cases.items():
+        started = time.perf_counter()
+        expected = skimage_ssim(img1, img2, full=True)[0]
+        skimage_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        score = structural_similarity(img1, img2)
+        fast_ms = (time.perf_counter() - started) * 1000
+        ok = abs(score - expected) <= tolerance
+        passed = passed and ok
+        print(
+            f"{name:<24}skimage {expected:.6f} ({skimage_ms:7.2f} ms)  "
+            f"fast {score:.6f} ({fast_ms:7.2f} ms)  {'ok' if ok else 'MISMATCH'}"
+        )
+    return passed
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if compare_with_skimage() else 1)
@@ -0,0 +1,249 @@
+# utils/templates.py
+
+import json
+import os
+import threading
+import time
+
+from utils.device_profile import device_profile, reference_profile
+from utils.matching import PreparedFrame, match_template, pyramid_scale
+
+ANCHORS_FILE = "template_anchors.json"
+
+
+class TemplateAnchors:
+    """
+    Screen regions where each template has been found before.
+
+    Every confident hit grows the template's bounding box of past hit
+    locations; once a template has `min_hits` hits, its search is limited to
+    that box plus `margin` pixels. The boxes are stored in ANCHORS_FILE so
+    they survive restarts.
+    """
+
+    def __init__(self, path=ANCHORS_FILE, margin=40, min_hits=3, hit_threshold=0.8):
+        self.path = path
+        self.margin = margin
+        self.min_hits = min_hits
+        self.hit_threshold = hit_threshold
+        self.lock = threading.Lock()
+        self.anchors = {}  # name -> {"box": [x0, y0, x1, y1], "hits": n}
+        self.load()
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path) as f:
+                    self.anchors = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Failed to load template anchors: {e}")
+                self.anchors = {}
+
+    def save(self):
+        with self.lock:
+            anchors = json.loads(json.dumps(self.anchors))
+        with open(self.path, "w") as f:
+            json.dump(anchors, f, indent=4)
+
+    def search_region(self, name):
+        """(x, y, w, h) window to search for `name`, or None for the full frame."""
+        with self.lock:
+            anchor = self.anchors.get(name)
+            if anchor is None or anchor["hits"] < self.min_hits:
+                return None
+            x0, y0, x1, y1 = anchor["box"]
+        x0 = max(0, x0 - self.margin)
+        y0 = max(0, y0 - self.margin)
+        return (x0, y0, x1 + self.margin - x0, y1 + self.margin - y0)
+
+    def record_hit(self, name, position, size):
+        x, y = position
+        w, h = size
+        with self.lock:
+            anchor = self.anchors.get(name)
+            if anchor is None:
+                anchor = self.anchors[name] = {"box": [x, y, x + w, y + h], "hits": 0}
+                grown = True
+            else:
+                box = anchor["box"]
+                new_box = [
+                    min(box[0], x),
+                    min(box[1], y),
+                    max(box[2], x + w),
+                    max(box[3], y + h),
+                ]
+                grown = new_box != box
+                anchor["box"] = new_box
+            anchor["hits"] += 1
+            reached_min_hits = anchor["hits"] == self.min_hits
+        if grown or reached_min_hits:
+            try:
+                self.save()
+            except OSError as e:
+                print(f"Failed to save template anchors: {e}")
+
+
+def precompute(frame):
+    """Build the grayscale and coarsest pyramid variants of `frame`."""
+    _ = frame.gray
+    scale = pyramid_scale(frame.shape)
+    if scale is not None:
+        frame.scaled(scale)
+
+
+class Template(PreparedFrame):
+    """
+    A named template image, optionally anchored to the screen region where
+    it usually appears.
+
+    The grayscale and pyramid variants used for matching are built once at
+    load time instead of on every match. On devices that do not run
+    at the reference resolution the template is matched through a rescaled
+    copy, rebuilt whenever the device resolution changes.
+    """
+
+    def __init__(self, name, image, anchors=None, full_search_interval=10.0):
+        super().__init__(image)
+        self.name = name
+        self.anchors = anchors
+        # While anchored, misses re-check the full frame at most this often
+        self.full_search_interval = full_search_interval
+        self.last_full_search = 0.0
+        # Reference position of the last confident hit, searched first
+        self.last_position = None
+        self.device_template = None
+        self.device_version = None
+        self.precompute()
+
+    def precompute(self):
+        precompute(self)
+
+    def for_device(self, profile=device_profile):
+        """The template at `profile`'s resolution (itself at the reference one)."""
+        if profile.is_reference:
+            return self
+        if self.device_version != profile.version:
+            device_template = PreparedFrame(profile.image(self.image))
+            precompute(device_template)
+            self.device_template = device_template
+            self.device_version = profile.version
+        return self.device_template
+
+    @property
+    def search_region(self):
+        if self.anchors is None:
+            return None
+        return self.anchors.search_region(self.name)
+
+    def full_search_due(self):
+        """
+        True when the next find may fall back from the learned window to the
+        full frame, so a result that only depends on the window is stale.
+        """
+        return (
+            self.search_region is not None
+            and time.time() - self.last_full_search >= self.full_search_interval
+        )
+
+    def find(self, screenshot, threshold=None, reference=False):
+        """
+        Anchored TM_CCOEFF_NORMED match. Searches the learned window first and
+        falls back to the full frame when there is no anchor yet, or
+        periodically when the window misses in case the element moved.
+
+        `screenshot` is a device frame, or with `reference` an image already
+        at reference size (e.g. a zoomed card crop); the position returned and
+        the learned windows are in reference coordinates. `threshold` lets the
+        early-exit matcher stop at the first hit, searching from the last one
+        outwards.
+        """
+        profile = reference_profile if reference else device_profile
+        template = self.for_device(profile)
+        hint = (
+            profile.point(*self.last_position)
+            if self.last_position is not None
+            else None
+        )
+        region = self.search_region
+        if region is not None:
+            position, similarity = match_template(
+                screenshot,
+                template,
+                profile.region(region),
+                threshold=threshold,
+                hint=hint,
+            )
+            if (
+                similarity > self.anchors.hit_threshold
+                or time.time() - self.last_full_search < self.full_search_interval
+            ):
+                return self._found(position, similarity, threshold, profile)
+
+        self.last_full_search = time.time()
+        position, similarity = match_template(
+            screenshot, template, threshold=threshold, hint=hint
+        )
+        position, similarity = self._found(position, similarity, threshold, profile)
+        if self.anchors is not None and similarity > self.anchors.hit_threshold:
+            self.anchors.record_hit(self.name, position, self.shape[1::-1])
+        return position, similarity
+
+    def _found(self, position, similarity, threshold, profile):
+        position = profile.to_reference(*position)
+        if threshold is not None and similarity > threshold:
+            self.last_position = position
+        return position, similarity
+
+
+def check_scaling(
+    screenshot_path="images/screenshot.png", resolutions=((450, 800),), tolerance=0.05
+):
+    """
+    Simulate smaller devices by resizing a captured 900x1600 frame and check
+    that a UI template still matches the device frame and a card template
+    still matches its reference-size zoomed crop. Returns True if every score
+    is within `tolerance` of a perfect match at the right position.
+    """
+    import cv2
+
+    from utils.constants import ZOOM_CARD_REGION
+
+    screenshot = cv2.imread(screenshot_path)
+    if screenshot is None:
+        print(f"Could not read {screenshot_path}")
+        return False
+    card = Template("card", reference_profile.crop(screenshot, ZOOM_CARD_REGION))
+    button = Template("button", screenshot[700:860, 100:400].copy())
+    saved_resolution = (device_profile.width, device_profile.height)
+    passed = True
+    try:
+        for width, height in resolutions:
+            device_profile.set_resolution(width, height)
+            frame = cv2.resize(
+                screenshot, (width, height), interpolation=cv2.INTER_AREA
+            )
+            cases = {
+                "button in frame": (button.find(frame), (100, 700)),
+                "card in zoomed crop": (
+                    card.find(
+                        device_profile.crop(frame, ZOOM_CARD_REGION), reference=True
+                    ),
+                    (0, 0),
+                ),
+            }
+            for name, (((x, y), similarity), expected) in cases.items():
+                ok = similarity >= 1 - tolerance and (
+                    abs(x - expected[0]) <= 2 and abs(y - expected[1]) <= 2
+                )
+                passed = passed and ok
+                print(
+                    f"{width}x{height} {name:<22} {similarity:.4f} at ({x}, {y})"
+                    f"{'' if ok else '  FAIL'}"
+                )
+    finally:
+        device_profile.set_resolution(*saved_resolution)
+    return passed
+
+
+if __name__ == "__main__":
+    raise SystemExit(0 if check_scaling() else 1)
@@ -110,7 +110,13 @@ class CardOptionsDialog(BaseDialog):
             card_label.image = api_tk_image  # Keep a reference
             card_label.pack(pady=5)
 
-            info_text = f"Name: {card.get('name', 'Unknown')}\nSet: {card.get('set_name', 'Unknown')}\nSimilarity: {similarity:.2f}"
+            # Cards past the SSIM-scored few are only ranked by image hash
+            match_text = (
+                "Ranked by image hash"
+                if similarity is None
+                else f"Similarity: {similarity:.2f}"
+            )
+            info_text = f"Name: {card.get('name', 'Unknown')}\nSet: {card.get('set_name', 'Unknown')}\n{match_text}"
             info_label = tk.Label(
                 card_frame,
                 text=info_text,
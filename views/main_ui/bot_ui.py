@@ -1,7 +1,10 @@
 import tkinter as tk
 
 from bot import PokemonBot
+from utils.adb_utils import set_capture_mode, set_debug_frame_max_age, set_resolution
 from utils.config_manager import ConfigManager
+from utils.image_utils import set_match_workers
+from utils.matching import set_matcher
 from views.components.section_frame import SectionFrame
 from views.debug_window import DebugWindow
 from views.dialogs.card_options_dialog import CardOptionsDialog
@@ -110,6 +113,24 @@ class BotUI:
         if config:
             self.app_state.update(config)
             self.status_section.update_emulator_path(self.app_state.program_path)
+            setters = {
+                "capture_mode": set_capture_mode,
+                "debug_frame_max_age": set_debug_frame_max_age,
+                "matcher": set_matcher,
+                "match_workers": set_match_workers,
+                "resolution": set_resolution,
+            }
+            for key, setter in setters.items():
+                if not config.get(key):
+                    continue
+                try:
+                    setter(config[key])
+                except ValueError as e:
+                    # A typo in configs.txt keeps the default instead of
+                    # stopping the app from starting
+                    self.log_message_proxy(
+                        f"❌ Ignoring invalid {key} in configs.txt: {e}"
+                    )
 
     def request_card_name(self, image, event, error_message=None):
         self.card_name_event = event
@@ -44,6 +44,29 @@ class MenuBuilder:
             label="Capture Region",
             command=self.bot_ui.ui_actions.take_region_screenshot,
         )
+        tools_menu.add_command(
+            label="Save Screen Sample",
+            command=self.bot_ui.ui_actions.save_screen_sample,
+        )
+        tools_menu.add_command(
+            label="Benchmark Capture",
+            command=self.bot_ui.ui_actions.benchmark_capture,
+        )
+        tools_menu.add_command(
+            label="ADB Metrics", command=self.bot_ui.ui_actions.show_adb_metrics
+        )
+        tools_menu.add_command(
+            label="Export ADB Metrics",
+            command=self.bot_ui.ui_actions.export_adb_metrics,
+        )
+        tools_menu.add_command(
+            label="Match Cache Stats",
+            command=self.bot_ui.ui_actions.show_match_cache_stats,
+        )
+        tools_menu.add_command(
+            label="Early Exit Stats",
+            command=self.bot_ui.ui_actions.show_early_exit_stats,
+        )
         tools_menu.add_command(
             label="Debug Window", command=self.bot_ui.ui_actions.toggle_debug_window
         )
@@ -1,9 +1,13 @@
 import os
-from tkinter import filedialog
+import threading
+from tkinter import filedialog, simpledialog
 
 import cv2
 
-from utils.adb_utils import take_screenshot
+from utils.adb_utils import benchmark_capture, take_screenshot
+from utils.device_profile import REFERENCE_HEIGHT, REFERENCE_WIDTH, device_profile
+from utils.matching import early_exit_stats
+from utils.metrics import adb_metrics
 from views.dialogs.device_connection_dialog import DeviceConnectionDialog
 from views.region_capture import RegionCaptureUI
 from views.themes import UI_COLORS
@@ -46,14 +50,44 @@ class UIActions:
     def take_screenshot(self):
         screenshot = take_screenshot()
         if screenshot is not None:
-            self.bot_ui.log_section.log_message("Screenshot taken.")
+            screenshot_path = os.path.join("images", "screenshot.png")
+            cv2.imwrite(screenshot_path, screenshot)
+            self.bot_ui.log_section.log_message(
+                f"Screenshot taken and saved to {screenshot_path}."
+            )
         else:
             self.bot_ui.log_section.log_message("Failed to take screenshot.")
 
+    def save_screen_sample(self):
+        log_message = self.bot_ui.log_section.log_message
+        screenshot = take_screenshot()
+        if screenshot is None:
+            log_message("Failed to take screenshot.")
+            return
+        classifier = self.bot_ui.bot.screen_classifier
+        screen_id, confidence = classifier.classify(screenshot)
+        known = ", ".join(classifier.screen_ids) or "none yet"
+        prompt = f"Screen id for this capture (known: {known})"
+        if screen_id is not None:
+            prompt += f"\nNearest match: {screen_id} ({confidence:.2f})"
+        screen_id = simpledialog.askstring(
+            "Save Screen Sample", prompt, parent=self.bot_ui.root
+        )
+        if not screen_id:
+            log_message("Screen sample capture cancelled.")
+            return
+        path = classifier.add_sample(screenshot, screen_id.strip().upper())
+        log_message(f"Screen sample saved to: {path}")
+
     def take_region_screenshot(self):
         screenshot = take_screenshot()
         if screenshot is not None:
-            capture_ui = RegionCaptureUI(screenshot)
+            # Regions are picked, and templates saved, in reference coordinates
+            capture_ui = RegionCaptureUI(
+                device_profile.to_reference_image(
+                    screenshot, (REFERENCE_WIDTH, REFERENCE_HEIGHT)
+                )
+            )
             region = capture_ui.get_region()
 
             if region:
@@ -90,6 +124,88 @@ class UIActions:
         else:
             self.bot_ui.log_section.log_message("Failed to take screenshot.")
 
+    def benchmark_capture(self):
+        log_message = self.bot_ui.log_section.log_message
+
+        def run_benchmark():
+            log_message("Benchmarking screen capture...")
+            for mode, stats in benchmark_capture().items():
+                if stats["mean_ms"] is None:
+                    log_message(f"• {mode}: all {stats['failed']} captures failed")
+                    continue
+                log_message(
+                    f"• {mode}: {stats['mean_ms']:.0f} ms/frame "
+                    f"(min {stats['min_ms']:.0f}, max {stats['max_ms']:.0f}, "
+                    f"{stats['failed']} failed)"
+                )
+
+        threading.Thread(target=run_benchmark, daemon=True).start()
+
+    def show_adb_metrics(self):
+        log_message = self.bot_ui.log_section.log_message
+        snapshot = adb_metrics.snapshot()
+        if not snapshot:
+            log_message("No ADB metrics recorded yet.")
+            return
+        log_message("ADB metrics:")
+        for op, stats in snapshot.items():
+            latency = stats["latency"]
+            if latency["count"]:
+                timing = (
+                    f"mean {latency['mean_ms']:.0f} ms, p95 {latency['p95_ms']:.0f} ms"
+                )
+            else:
+                timing = "no timings"
+            log_message(
+                f"• {op}: {stats['calls']} calls, {timing}, "
+                f"{stats['errors']} errors, {stats['timeouts']} timeouts, "
+                f"{stats['bytes'] / 1024:.0f} KiB"
+            )
+
+    def show_match_cache_stats(self):
+        stats = self.bot_ui.bot.image_processor.match_cache.stats()
+        hit_rate = (
+            f"{stats['hit_rate']:.0%}" if stats["hit_rate"] is not None else "n/a"
+        )
+        self.bot_ui.log_section.log_message(
+            f"Match cache: {stats['hits']} hits, {stats['misses']} misses "
+            f"({hit_rate} hit rate), {stats['entries']} entries, "
+            f"{stats['evictions']} evictions"
+        )
+
+    def show_early_exit_stats(self):
+        stats = early_exit_stats.stats()
+        skipped = (
+            f"{stats['skipped_ratio']:.0%}"
+            if stats["skipped_ratio"] is not None
+            else "n/a"
+        )
+        self.bot_ui.log_section.log_message(
+            f"Early exit: {stats['early_exits']} of {stats['searches']} searches "
+            f"stopped early, {stats['positions_skipped']} of "
+            f"{stats['positions_searched'] + stats['positions_skipped']} "
+            f"match positions skipped ({skipped})"
+        )
+
+    def export_adb_metrics(self):
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[
+                ("JSON files", "*.json"),
+                ("Prometheus text", "*.prom"),
+            ],
+            title="Export ADB Metrics",
+        )
+        if not file_path:
+            return
+        if file_path.endswith(".prom"):
+            content = adb_metrics.to_prometheus()
+        else:
+            content = adb_metrics.to_json()
+        with open(file_path, "w") as f:
+            f.write(content)
+        self.bot_ui.log_section.log_message(f"ADB metrics exported to: {file_path}")
+
     def show_device_connection_dialog(self):
         DeviceConnectionDialog(
             self.bot_ui.root,